@@ -1,10 +1,96 @@
-from fastapi import APIRouter
-from app.models.schema import BatteryInput
-from app.services.model_service import run_prediction
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.core import executors
+from app.core.config import settings
+from app.models.schema import BatteryInput, SweepRequest
+from app.services.model_service import predict_async, predict_batcher, run_batch_prediction
+from app.services.prediction_cache import prediction_cache
+from app.services.sweep_service import FORMATS, Sweep, check_format, encoder_for
+from app.utils.model_loader import registry
+from app.utils.ndjson import NDJSON
 
 router = APIRouter()
 
-@router.post("/predict")
-def predict(data: BatteryInput):
-    prediction = run_prediction(data)
+@router.post("/predict", dependencies=[Depends(executors.limit("predict", settings.CONCURRENCY_PREDICT))])
+async def predict(data: BatteryInput):
+    prediction = await predict_async(data)
     return {"prediction": prediction}
+
+@router.get("/predict/stats")
+def predict_stats():
+    return {
+        "microbatch": predict_batcher.stats(),
+        "cache": prediction_cache.stats(),
+        "executors": executors.stats(),
+    }
+
+def _parse_batch(body: bytes, ndjson: bool) -> list[BatteryInput]:
+    try:
+        if ndjson:
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            rows = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of inputs")
+    if len(rows) > settings.PREDICT_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"Batch too large (max {settings.PREDICT_MAX_BATCH_SIZE} inputs)"
+        )
+    items = []
+    for i, row in enumerate(rows):
+        try:
+            items.append(BatteryInput(**row))
+        except (TypeError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail={"index": i, "error": str(e)})
+    return items
+
+@router.post("/predict/batch",
+             dependencies=[Depends(executors.limit("predict_batch", settings.CONCURRENCY_PREDICT_BATCH))])
+async def predict_batch(request: Request):
+    """Score a JSON array or NDJSON stream of BatteryInput with one model call.
+    NDJSON requests get one {"index", "prediction"} line per input back.
+    Runs on the process pool when one is configured, else the CPU thread pool.
+    """
+    ndjson = request.headers.get("content-type", "").startswith(NDJSON)
+    items = _parse_batch(await request.body(), ndjson)
+    pool = executors.process_pool if executors.process_pool.enabled else executors.cpu_pool
+    predictions = await pool.run(run_batch_prediction, items)
+    if not ndjson:
+        return {"count": len(predictions), "predictions": predictions}
+
+    def lines(chunk: int = 1000):
+        for start in range(0, len(predictions), chunk):
+            yield "".join(
+                json.dumps({"index": i, "prediction": p}) + "\n"
+                for i, p in enumerate(predictions[start:start + chunk], start)
+            )
+    return StreamingResponse(lines(), media_type=NDJSON)
+
+@router.post("/predict/sweep",
+             dependencies=[Depends(executors.limit("predict_batch", settings.CONCURRENCY_PREDICT_BATCH))])
+async def predict_sweep(request: SweepRequest, format: str = Query("json", pattern="^(json|csv|arrow)$")):
+    """Predict every point of the Cartesian product of `grid` applied to `base`.
+    Streamed in SWEEP_CHUNK_SIZE chunks as one JSON document ({fields, axes,
+    shape, count, outputs, predictions}), CSV rows or an Arrow IPC stream.
+    """
+    check_format(format)
+    # Load the model if nothing has yet; Sweep answers 503 if there is still none,
+    # before the stream starts rather than halfway through it
+    model, _ = registry.current() if registry.ready else await asyncio.to_thread(registry.current)
+    sweep = Sweep(request, settings.SWEEP_MAX_POINTS, settings.SWEEP_CHUNK_SIZE, model)
+    encode = encoder_for(sweep, format)
+    # The first chunk is admitted like any pool job, so a busy pool answers 503
+    # before anything is sent; the rest run as part of that admitted stream.
+    first = await executors.cpu_pool.run(encode, 0)
+
+    async def chunks():
+        yield first
+        for start in sweep.chunks()[1:]:
+            yield await executors.cpu_pool.run(encode, start, admitted=True)
+    return StreamingResponse(chunks(), media_type=FORMATS[format],
+                             headers={"X-Sweep-Points": str(sweep.total)})
@@ -1,21 +1,92 @@
-from fastapi import APIRouter, Query
-from app.services.charging_service import ChargingService
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from app.core import executors
+from app.core.config import settings
+from app.core.executors import cpu_pool
+from app.services.charging_service import charging_service
+from app.services.station_filters import StationFilter
+from app.services.trip_planner import trip_planner
+from app.utils.http_cache import dumps, payload_response
 
 router = APIRouter()
-charging_service = ChargingService()
+stations_limit = Depends(executors.limit("stations", settings.CONCURRENCY_STATIONS))
 
-@router.get("/charging-stations")
-def get_stations():
-    return charging_service.get_charging_stations()
+def station_filter(
+    connector: Optional[str] = Query(None, description="Comma-separated connector types, any match (e.g. CCS,Type 2)"),
+    operator: Optional[str] = Query(None, description="Comma-separated station operators, any match"),
+    min_kw: Optional[float] = Query(None, ge=0),
+    max_cost: Optional[float] = Query(None, ge=0, description="USD/kWh"),
+    renewable: bool = Query(False, description="Only stations on renewable energy"),
+    open_now: bool = Query(False, description="Only stations open now (local time estimated from longitude)"),
+) -> StationFilter:
+    return StationFilter.from_params(connector, operator, min_kw, max_cost, renewable, open_now)
 
-@router.get("/best-station")
-def get_best_station(
+@router.get("/charging-stations", dependencies=[stations_limit])
+async def get_stations(
+    request: Request,
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: Optional[float] = Query(None, ge=0, le=24),
+    filt: StationFilter = Depends(station_filter),
+):
+    if bbox is None and zoom is None and not filt.active:
+        return payload_response(request, await cpu_pool.run(charging_service.get_charging_stations_payload))
+    box = None
+    if bbox is not None:
+        try:
+            box = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            box = ()
+        if len(box) != 4 or not (-90 <= box[1] <= box[3] <= 90):
+            raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    content = await cpu_pool.run(lambda: dumps(charging_service.get_charging_stations(box, zoom, filt)))
+    return Response(content=content, media_type="application/json")
+
+@router.get("/charging-stations/tiles/{z}/{x}/{y}", dependencies=[stations_limit])
+async def get_station_tile(
+    request: Request, z: int = Path(..., ge=0, le=22), x: int = Path(...), y: int = Path(...),
+    filt: StationFilter = Depends(station_filter),
+):
+    return payload_response(request, await cpu_pool.run(charging_service.get_tile, z, x, y, filt))
+
+@router.get("/charging-stations/stats")
+def get_stations_stats():
+    return charging_service.store.stats()
+
+@router.get("/best-station", dependencies=[stations_limit])
+async def get_best_station(
     vehicle_lat: float = Query(...),
     vehicle_lon: float = Query(...),
     battery_percent: float = Query(...),
     battery_capacity_kwh: float = Query(60.0),
     efficiency_km_per_kwh: float = Query(6.0),
+    k: Optional[int] = Query(None, ge=1, le=100),
+    sort_by: str = Query("distance", pattern="^(distance|cost|rating)$"),
+    filt: StationFilter = Depends(station_filter),
+):
+    return await cpu_pool.run(
+        charging_service.get_best_station,
+        vehicle_lat, vehicle_lon, battery_percent, battery_capacity_kwh, efficiency_km_per_kwh,
+        k=k, sort_by=sort_by, filt=filt,
+    )
+
+@router.get("/plan-trip", dependencies=[Depends(executors.limit("plan_trip", settings.CONCURRENCY_PLAN_TRIP))])
+async def plan_trip(
+    start_lat: float = Query(..., ge=-90, le=90),
+    start_lon: float = Query(..., ge=-180, le=180),
+    end_lat: float = Query(..., ge=-90, le=90),
+    end_lon: float = Query(..., ge=-180, le=180),
+    battery_percent: float = Query(..., ge=0, le=100),
+    battery_capacity_kwh: float = Query(60.0, gt=0),
+    efficiency_km_per_kwh: float = Query(6.0, gt=0),
+    optimize: str = Query("time", pattern="^(time|cost)$"),
+    avg_speed_kmph: float = Query(80.0, gt=0),
+    reserve_percent: float = Query(10.0, ge=0, lt=100),
+    charge_to_percent: float = Query(80.0, gt=0, le=100),
+    max_charge_kw: float = Query(150.0, gt=0),
 ):
-    return charging_service.get_best_station(
-        vehicle_lat, vehicle_lon, battery_percent, battery_capacity_kwh, efficiency_km_per_kwh
+    return await cpu_pool.run(
+        trip_planner.plan,
+        start_lat, start_lon, end_lat, end_lon, battery_percent, battery_capacity_kwh, efficiency_km_per_kwh,
+        optimize=optimize, avg_speed_kmph=avg_speed_kmph, reserve_percent=reserve_percent,
+        charge_to_percent=charge_to_percent, max_charge_kw=max_charge_kw,
     )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from app.utils.model_loader import registry
+
+router = APIRouter()
+
+@router.get("/models")
+def list_models():
+    return {"models": [registry.info()]}
+
+@router.post("/models/reload")
+async def reload_models():
+    await run_in_threadpool(registry.load)
+    return {"models": [registry.info()]}
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import battery, route, charging, profile
+from app.api.v1.endpoints import battery, route, charging, profile, models, telemetry
 
 router = APIRouter()
 
@@ -7,3 +7,5 @@ router.include_router(battery.router, tags=["Battery"])
 router.include_router(route.router, tags=["Route"])
 router.include_router(charging.router, tags=["Charging"])
 router.include_router(profile.router, tags=["Profile"])
+router.include_router(models.router, tags=["Models"])
+router.include_router(telemetry.router, tags=["Telemetry"])
@@ -1,9 +1,20 @@
-from fastapi import APIRouter
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.core import executors
+from app.core.config import settings
 from app.models.profile_schema import EVProfileCreate, EVProfileUpdate
 from app.services.profile_service import ProfileService
+from app.utils.model_loader import registry
+from app.utils.ndjson import NDJSON, ndjson_lines
 
 router = APIRouter()
 profile_service = ProfileService()
+bulk_limit = Depends(executors.limit("profiles_bulk", settings.CONCURRENCY_PROFILES_BULK))
+
+MAX_REPORTED_ERRORS = 100
 
 @router.post("/ev-profile")
 async def create_profile(profile: EVProfileCreate):
@@ -16,3 +27,74 @@ async def get_profile(user_id: str):
 @router.put("/ev-profile/{user_id}")
 async def update_profile(user_id: str, profile: EVProfileUpdate):
     return await profile_service.update(user_id, profile.dict())
+
+@router.post("/ev-profiles/bulk", dependencies=[bulk_limit])
+async def bulk_import_profiles(request: Request):
+    """Upsert an NDJSON stream of EVProfileCreate, PROFILE_BULK_CHUNK_SIZE rows per bulk_write.
+    Invalid lines are reported (up to MAX_REPORTED_ERRORS) and skipped; the rest are written.
+    Within a chunk a later line for the same user_id wins and the earlier one is
+    counted in "duplicates", so received == inserted + updated + failed + duplicates.
+    """
+    summary = {"received": 0, "inserted": 0, "updated": 0, "failed": 0, "duplicates": 0, "errors": []}
+
+    def report(errors, counter="failed"):
+        summary[counter] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend(errors[:max(room, 0)])
+
+    async def flush(chunk):
+        result = await profile_service.bulk_upsert(chunk)
+        summary["inserted"] += result["inserted"]
+        summary["updated"] += result["updated"]
+        report(result["errors"])
+        report(result["duplicates"], "duplicates")
+
+    chunk = []
+    async for number, line in ndjson_lines(request):
+        if not line.strip():
+            continue
+        summary["received"] += 1
+        try:
+            chunk.append((number, EVProfileCreate(**json.loads(line)).dict()))
+        except (ValueError, TypeError, ValidationError) as e:  # bad JSON or schema
+            report([{"line": number, "error": str(e)}])
+            continue
+        if len(chunk) >= settings.PROFILE_BULK_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+    return summary
+
+@router.get("/ev-profiles/export", dependencies=[bulk_limit])
+async def export_profiles():
+    """Every stored profile as NDJSON, streamed from a Mongo cursor batch by batch."""
+    async def lines():
+        async for batch in profile_service.export():
+            yield "".join(json.dumps(p) + "\n" for p in batch)
+    return StreamingResponse(lines(), media_type=NDJSON)
+
+@router.get("/ev-profiles/scores", dependencies=[bulk_limit])
+async def score_profiles(
+    trip_distance_km: float = Query(100.0, gt=0),
+    avg_speed_kmph: float = Query(60.0, gt=0),
+    elevation_gain_m: float = Query(100.0, ge=0),
+    traffic_index: float = Query(5.0, ge=0),
+):
+    """Battery model prediction for every stored profile on a reference trip, as
+    NDJSON {"user_id", "prediction"} lines; profiles are scored in batches.
+    """
+    # Load the model if nothing has yet, and fail before the stream starts, not halfway through it
+    model = registry.get() if registry.ready else await asyncio.to_thread(registry.get)
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    trip = dict(Trip_Distance_km=trip_distance_km, Avg_Speed_kmph=avg_speed_kmph,
+                Elevation_Gain_m=elevation_gain_m, Traffic_Index=traffic_index)
+
+    async def lines():
+        async for batch, predictions in profile_service.score_fleet(**trip):
+            yield "".join(
+                json.dumps({"user_id": p.get("user_id"), "prediction": pred}) + "\n"
+                for p, pred in zip(batch, predictions)
+            )
+    return StreamingResponse(lines(), media_type=NDJSON)
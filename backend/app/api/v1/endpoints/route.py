@@ -1,16 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from app.core import executors
 from app.models.schema import RouteRequest
 from app.services.route_service import RouteService
 from app.services.mapbox_service import MapboxService
+from app.services.mapbox_cache import MapboxCache
 from app.core.config import settings
+import os
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "cache", "mapbox.sqlite3")
 
 router = APIRouter()
-mapbox_service = MapboxService(settings.MAPBOX_ACCESS_TOKEN)
+mapbox_cache = MapboxCache(
+    DEFAULT_CACHE_PATH if settings.MAPBOX_CACHE_PATH is None else settings.MAPBOX_CACHE_PATH,
+    settings.MAPBOX_CACHE_MEMORY_SIZE,
+) if settings.MAPBOX_CACHE_ENABLED else None
+mapbox_service = MapboxService(
+    settings.MAPBOX_ACCESS_TOKEN, settings.MAPBOX_API_URL, cache=mapbox_cache,
+    coord_precision=settings.MAPBOX_CACHE_COORD_PRECISION,
+    geocode_ttl=settings.MAPBOX_GEOCODE_TTL_S, directions_ttl=settings.MAPBOX_DIRECTIONS_TTL_S,
+)
 route_service = RouteService(mapbox_service)
 
-@router.post("/optimize-route")
+@router.post("/optimize-route", dependencies=[Depends(executors.limit("route", settings.CONCURRENCY_ROUTE))])
 async def optimize_route(data: RouteRequest):
     result = await route_service.optimize(data)
     if not result:
         raise HTTPException(status_code=400, detail="Invalid location or route not found")
     return result
+
+@router.get("/mapbox/stats")
+def mapbox_stats():
+    return {
+        "cache": mapbox_cache.stats() if mapbox_cache else None,
+        "http": mapbox_service.http.stats(),
+    }
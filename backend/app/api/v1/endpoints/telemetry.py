@@ -0,0 +1,81 @@
+import json
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.core.config import settings
+from app.models.telemetry_schema import TelemetryPoint
+from app.services.telemetry import telemetry_hub
+from app.utils.ndjson import NDJSON, ndjson_lines
+
+router = APIRouter()
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that answers while the request body is still arriving.
+    The stock one (before ASGI 2.4) runs a disconnect listener that would race
+    request.stream() for body messages; here the body iterator owns receive()
+    and request.stream() raises ClientDisconnect itself.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+def _points(message) -> list[TelemetryPoint]:
+    """A message is one point object or a list of them."""
+    items = message if isinstance(message, list) else [message]
+    if len(items) > settings.TELEMETRY_MAX_MESSAGE_POINTS:
+        raise ValueError(f"At most {settings.TELEMETRY_MAX_MESSAGE_POINTS} points per message")
+    return [TelemetryPoint(**item) for item in items]
+
+@router.websocket("/telemetry/ws")
+async def telemetry_socket(websocket: WebSocket):
+    """Push telemetry points as JSON text frames; the server answers with
+    {"type": "update", ...} whenever a vehicle's range or best station changes
+    noticeably, and {"type": "error", ...} for messages it cannot read.
+    """
+    await websocket.accept()
+    telemetry_hub.connections += 1
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                points = _points(json.loads(raw))
+            except (ValueError, TypeError, ValidationError) as e:  # bad JSON or schema
+                await websocket.send_json({"type": "error", "error": str(e)})
+                continue
+            for point in points:
+                update = await telemetry_hub.ingest(point)
+                if update is not None:
+                    await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        telemetry_hub.connections -= 1
+
+@router.post("/telemetry")
+async def ingest_telemetry(request: Request):
+    """Ingest an NDJSON stream of TelemetryPoint; responds with an NDJSON stream of
+    the updates (and per-line errors) as the body is read.
+    """
+    async def lines():
+        async for number, line in ndjson_lines(request):
+            if not line.strip():
+                continue
+            try:
+                point = TelemetryPoint(**json.loads(line))
+            except (ValueError, TypeError, ValidationError) as e:
+                yield json.dumps({"type": "error", "line": number, "error": str(e)}) + "\n"
+                continue
+            update = await telemetry_hub.ingest(point)
+            if update is not None:
+                yield json.dumps(update) + "\n"
+    return DuplexStreamingResponse(lines(), media_type=NDJSON)
+
+@router.get("/telemetry/stats")
+async def telemetry_stats():
+    return telemetry_hub.stats()
+
+@router.get("/telemetry/{vehicle_id}")
+async def get_vehicle_state(vehicle_id: str):
+    state = telemetry_hub.get(vehicle_id)
+    if state is None or not state.count:
+        raise HTTPException(status_code=404, detail="No telemetry for this vehicle")
+    return state.summary()
@@ -1,9 +1,106 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     MAPBOX_ACCESS_TOKEN: str
+    MAPBOX_API_URL: str = "https://api.mapbox.com"  # point at a local stand-in for testing
+    MAPBOX_CACHE_ENABLED: bool = True
+    MAPBOX_CACHE_PATH: Optional[str] = None  # SQLite file; defaults to backend/cache/mapbox.sqlite3, "" = memory only
+    MAPBOX_CACHE_MEMORY_SIZE: int = 2048
+    MAPBOX_CACHE_COORD_PRECISION: int = 4    # decimals kept in directions keys (~11 m)
+    MAPBOX_GEOCODE_TTL_S: float = 30 * 86400
+    MAPBOX_DIRECTIONS_TTL_S: float = 86400
+
+    # Outbound Mapbox HTTP pool
+    MAPBOX_HTTP2: bool = True
+    MAPBOX_MAX_CONNECTIONS: int = 100
+    MAPBOX_MAX_KEEPALIVE: int = 20
+    MAPBOX_KEEPALIVE_EXPIRY_S: float = 30.0
+    MAPBOX_CONNECT_TIMEOUT_S: float = 5.0
+    MAPBOX_READ_TIMEOUT_S: float = 15.0
+    MAPBOX_RETRIES: int = 2
+    MAPBOX_DIRECTIONS_RATE_PER_MIN: float = 300   # Mapbox default quota, for the whole host
+    MAPBOX_GEOCODING_RATE_PER_MIN: float = 600
+    MAPBOX_BREAKER_THRESHOLD: int = 5
+    MAPBOX_BREAKER_RESET_S: float = 30.0
     DB_NAME: str = "ev_ml_db"
 
+    # MongoDB (Motor) connection pool; 0 leaves the driver default / no limit
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 0
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 0
+    PROFILE_CACHE_SIZE: int = 10000          # 0 disables the profile read cache
+    PROFILE_CACHE_TTL_S: float = 30.0
+    PROFILE_BULK_CHUNK_SIZE: int = 1000      # rows per bulk_write / export batch
+    PROFILE_SCORE_BATCH_SIZE: int = 2000     # profiles per model call when scoring the fleet
+
+    # Charging-station map queries
+    STATION_CLUSTER_MAX_ZOOM: int = 9      # cluster below this zoom, raw points at/above it
+    STATION_CLUSTER_CELLS_PER_TILE: int = 8
+    STATION_TILE_CACHE_SIZE: int = 2048
+    STATION_FILTER_CACHE_SIZE: int = 256
+    TRIP_PLANNER_CELL_KM: float = 25.0        # one candidate stop per cell; 0 keeps every station
+    TRIP_PLANNER_MAX_EXPANSIONS: int = 20000
+
+    # Elevation (SRTM .hgt tiles)
+    DEM_TILE_DIR: Optional[str] = None        # defaults to ML_Models/dem
+    DEM_TILE_CACHE_SIZE: int = 64
+    DEM_SAMPLE_INTERVAL_M: float = 100.0
+
+    # Battery model
+    MODEL_PATH: Optional[str] = None          # defaults to ML_Models/ev_battery_model.pkl
+    MODEL_MMAP_MODE: str = "r"                # "" disables memory-mapping
+    MODEL_RELOAD_INTERVAL_S: float = 5.0
+    PREDICT_MAX_BATCH_SIZE: int = 10000
+    PREDICT_MICROBATCH_ENABLED: bool = True
+    PREDICT_MICROBATCH_MAX_SIZE: int = 64
+    PREDICT_MICROBATCH_MAX_WAIT_MS: float = 2.0
+    SWEEP_MAX_POINTS: int = 10_000_000
+    SWEEP_CHUNK_SIZE: int = 50_000          # rows per model call / streamed chunk (~12 MB of features)
+
+    # Live telemetry
+    TELEMETRY_BUFFER_SIZE: int = 120          # points kept per vehicle
+    TELEMETRY_MAX_VEHICLES: int = 50_000      # least recently seen vehicles are dropped beyond this
+    TELEMETRY_RELOOKUP_KM: float = 2.0        # re-run the station lookup after moving this far
+    TELEMETRY_RELOOKUP_RANGE_PCT: float = 10.0  # ...or when range changes by this much
+    TELEMETRY_PUSH_RANGE_KM: float = 1.0      # push an update when range moves by at least this
+    TELEMETRY_MAX_MESSAGE_POINTS: int = 1000  # points per WebSocket message
+
+    # Server worker processes (set by gunicorn.conf.py); per-host quotas are split across them
+    WEB_CONCURRENCY: int = 1
+
+    # Worker pools and per-endpoint concurrency (0 disables a pool / limit)
+    CPU_POOL_WORKERS: int = 8
+    CPU_POOL_QUEUE: int = 64
+    PROCESS_POOL_WORKERS: int = 0             # >0 runs /predict/batch in processes with the model preloaded
+    PROCESS_POOL_QUEUE: int = 16
+    PROCESS_POOL_START_METHOD: str = "spawn"
+    ENDPOINT_LIMIT_WAIT_S: float = 0.5
+    CONCURRENCY_PREDICT: int = 64
+    CONCURRENCY_PREDICT_BATCH: int = 4
+    CONCURRENCY_STATIONS: int = 32
+    CONCURRENCY_ROUTE: int = 32
+    CONCURRENCY_PLAN_TRIP: int = 8
+    CONCURRENCY_PROFILES_BULK: int = 4
+
+    # Instrumentation
+    SLOW_REQUEST_MS: float = 1000.0           # print requests slower than this; 0 disables
+    PROFILING_ENABLED: bool = False           # allow ?profile=1 / X-Profile: 1 per-request profiles
+    PROFILING_TOKEN: Optional[str] = None     # if set, X-Profile-Token must match
+    PROFILE_DIR: Optional[str] = None         # defaults to backend/profiles
+    HEALTH_MONGO_TIMEOUT_S: float = 1.0       # /health reports Mongo down if a ping takes longer
+
+    # Prediction result cache ("memory" or "redis")
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_BACKEND: str = "memory"
+    PREDICTION_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    PREDICTION_CACHE_SIZE: int = 10000
+    PREDICTION_CACHE_TTL_S: float = 300.0
+    PREDICTION_CACHE_DECIMALS: Optional[int] = None  # round continuous inputs before keying
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,74 +1,262 @@
 """
 MongoDB async database layer using Motor.
 Replaces the previous SQLite / aiosqlite implementation.
+
+Profile writes are a single find_one_and_update round trip; `user_id` carries a
+unique index so concurrent upserts can't create duplicates. Reads go through a
+small in-process TTL cache that every write in this process updates or
+invalidates; other workers see changes once their entry expires
+(PROFILE_CACHE_TTL_S). init_db() accepts a ready-made client, so the layer can
+run against mongomock_motor or a local mongod in tests.
 """
+from collections import OrderedDict
+import asyncio
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from typing import Dict, Any, Optional
 import os
 from dotenv import load_dotenv
 
+from app.core import metrics
+from app.core.config import settings
+
 load_dotenv()
 
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "ev_ml_db")
+PROFILES = "ev_profiles"
 
 # Module-level Motor client / db references
 _client: Optional[AsyncIOMotorClient] = None
+_owns_client = False
 _db = None
 
 
-async def init_db():
-    """Connect to MongoDB and verify the connection."""
-    global _client, _db
-    _client = AsyncIOMotorClient(MONGODB_URL)
+class ProfileCache:
+    """Bounded LRU of profile documents, each valid for `ttl` seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # user_id -> (expires_at, doc)
+        self.hits = metrics.counter("profile_cache_hits", "Profile reads served from memory")
+        self.misses = metrics.counter("profile_cache_misses", "Profile reads that went to MongoDB")
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        item = self._data.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            self._data.pop(user_id, None)
+            self.misses.inc()
+            return None
+        self._data.move_to_end(user_id)
+        self.hits.inc()
+        return dict(item[1])  # callers may mutate their copy
+
+    def set(self, user_id: str, doc: Dict[str, Any]):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        self._data[user_id] = (time.monotonic() + self.ttl, dict(doc))
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self._data.clear()
+        else:
+            self._data.pop(user_id, None)
+
+    def stats(self) -> dict:
+        hits, misses = self.hits.value, self.misses.value
+        return {
+            "entries": len(self._data),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+profile_cache = ProfileCache(settings.PROFILE_CACHE_SIZE, settings.PROFILE_CACHE_TTL_S)
+
+
+def _client_options() -> Dict[str, Any]:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = settings.MONGO_SOCKET_TIMEOUT_MS
+    return options
+
+
+async def init_db(client=None):
+    """Connect to MongoDB, verify the connection and ensure indexes.
+
+    `client` replaces the Motor client built from MONGODB_URL, e.g. a
+    mongomock_motor.AsyncMongoMockClient in tests; it is not closed by close_db().
+    """
+    global _client, _db, _owns_client
+    _owns_client = client is None
+    _client = client if client is not None else AsyncIOMotorClient(MONGODB_URL, **_client_options())
     _db = _client[DB_NAME]
+    profile_cache.invalidate()
 
-    # Ping to verify connection
-    await _client.admin.command("ping")
+    if _owns_client:
+        # Ping to verify connection
+        await _client.admin.command("ping")
+    try:
+        await _db[PROFILES].create_index("user_id", unique=True)
+    except (DuplicateKeyError, OperationFailure) as e:
+        print(f"Could not create unique index on {PROFILES}.user_id (duplicate profiles?): {e}")
     print(f"Connected to MongoDB: database '{DB_NAME}'")
 
 
 async def close_db():
     """Close the MongoDB connection."""
-    global _client, _db
+    global _client, _db, _owns_client
     if _client:
-        _client.close()
+        if _owns_client:
+            _client.close()
         _client = None
         _db = None
+        _owns_client = False
+        profile_cache.invalidate()
         print("MongoDB connection closed")
 
 
+async def ping_db(timeout: float = 1.0) -> bool:
+    """True if MongoDB answers a ping within `timeout` seconds."""
+    if _client is None:
+        return False
+    try:
+        await asyncio.wait_for(_client.admin.command("ping"), timeout)
+    except Exception:
+        return False
+    return True
+
+
 def _get_collection():
     if _db is None:
         raise RuntimeError("Database not initialized. Call init_db() first.")
-    return _db["ev_profiles"]
+    return _db[PROFILES]
 
 
 async def get_ev_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """Retrieve an EV profile document by user_id."""
+    doc = profile_cache.get(user_id)
+    if doc is not None:
+        return doc
     col = _get_collection()
-    doc = await col.find_one({"user_id": user_id}, {"_id": 0})
+    with metrics.span("mongo_find_one"):
+        doc = await col.find_one({"user_id": user_id}, {"_id": 0})
+    if doc is not None:
+        profile_cache.set(user_id, doc)
     return doc  # None if not found
 
 
 async def save_ev_profile(user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
     """Upsert an EV profile document for the given user_id.
 
-    Returns a dict with 'success' and 'is_new' keys.
+    Returns a dict with 'success', 'is_new' and the stored 'profile'.
     """
     col = _get_collection()
 
-    # Determine if document already exists (for is_new flag)
-    existing = await col.find_one({"user_id": user_id}, {"_id": 1})
-    is_new = existing is None
-
     # Always store user_id inside the document
-    profile_data["user_id"] = user_id
+    profile_data = {**profile_data, "user_id": user_id}
+
+    # One round trip: the pre-image tells us whether the upsert inserted
+    for attempt in range(2):
+        try:
+            with metrics.span("mongo_upsert"):
+                before = await col.find_one_and_update(
+                    {"user_id": user_id},
+                    {"$set": profile_data},
+                    projection={"_id": 0},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE,
+                )
+            break
+        except DuplicateKeyError:
+            # Lost an insert race on the unique index; the retry matches the winner's document
+            if attempt:
+                raise
+
+    profile = {**(before or {}), **profile_data}
+    profile_cache.set(user_id, profile)
+    return {"success": True, "is_new": before is None, "profile": profile}
+
+
+async def update_ev_profile(user_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Set `changes` on an existing profile; returns the updated document, or None if there is none."""
+    col = _get_collection()
+    if not changes:
+        return await get_ev_profile(user_id)
+    with metrics.span("mongo_update"):
+        doc = await col.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": changes},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    if doc is None:
+        profile_cache.invalidate(user_id)
+    else:
+        profile_cache.set(user_id, doc)
+    return doc
+
 
-    await col.update_one(
-        {"user_id": user_id},
-        {"$set": profile_data},
-        upsert=True,
-    )
+async def bulk_save_ev_profiles(profiles: list[Dict[str, Any]]) -> Dict[str, Any]:
+    """Upsert many profiles (each with a user_id) in one unordered bulk_write.
 
-    return {"success": True, "is_new": is_new}
\ No newline at end of file
+    When a user_id appears more than once the last row wins, as if the rows were
+    saved one by one; the earlier ones are not written and are listed in
+    `duplicates` with the index of the row that replaced them. Returns inserted /
+    updated counts plus per-row write errors; all indexes point into `profiles`.
+    """
+    col = _get_collection()
+    if not profiles:
+        return {"inserted": 0, "updated": 0, "errors": [], "duplicates": []}
+    last = {p["user_id"]: i for i, p in enumerate(profiles)}
+    kept = sorted(last.values())
+    duplicates = [
+        {"index": i, "superseded_by": last[p["user_id"]]}
+        for i, p in enumerate(profiles) if last[p["user_id"]] != i
+    ]
+    ops = [UpdateOne({"user_id": profiles[i]["user_id"]}, {"$set": profiles[i]}, upsert=True) for i in kept]
+    try:
+        with metrics.span("mongo_bulk_write"):
+            result = (await col.bulk_write(ops, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+    # Merged documents aren't returned, so drop rather than update cached copies
+    for user_id in last:
+        profile_cache.invalidate(user_id)
+    return {
+        "inserted": result.get("nUpserted", 0),
+        "updated": result.get("nMatched", 0),
+        "errors": [
+            {"index": kept[err["index"]], "error": err.get("errmsg", "")}
+            for err in result.get("writeErrors", [])
+        ],
+        "duplicates": duplicates,
+    }
+
+
+async def iter_ev_profiles(batch_size: int = 1000):
+    """Yield lists of up to batch_size profile documents from a server-side cursor."""
+    col = _get_collection()
+    cursor = col.find({}, {"_id": 0}, batch_size=batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,178 @@
+"""
+Bounded worker pools and per-endpoint concurrency limits for CPU-bound work.
+
+`cpu_pool` is a thread pool for NumPy / sklearn calls that release the GIL.
+`process_pool` (off unless PROCESS_POOL_WORKERS > 0) runs pure-Python work in
+separate processes, each loading the model once at start-up. A pool admits at
+most max_workers + max_queue jobs; beyond that run() fails fast with 503
+instead of queueing without bound. Endpoint groups additionally hold an
+EndpointLimit, which answers 429 when a group is at its concurrency limit, so
+slow model calls can't occupy every slot that route or profile requests need.
+"""
+import asyncio
+import functools
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread",
+                 initializer=None, start_method: str | None = None):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.start_method = start_method
+        self._executor: Executor | None = None
+        self._inflight = 0
+        self.rejected = metrics.counter(f"executor_{name}_rejected", f"Jobs rejected by the {name} pool")
+        self.wait_ms = metrics.histogram(f"executor_{name}_wait_ms", f"Time jobs wait for a {name} worker (ms)")
+        self.run_ms = metrics.histogram(f"executor_{name}_run_ms", f"Job run time on the {name} pool (ms)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def start(self):
+        """Create the workers. Called from the app's startup hook, i.e. after any fork."""
+        if self._executor is not None or not self.enabled:
+            return
+        if self.kind == "process":
+            ctx = multiprocessing.get_context(self.start_method) if self.start_method else None
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=ctx, initializer=self.initializer)
+        else:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name,
+                                                initializer=self.initializer)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args, admitted: bool = False, **kwargs):
+        """Run fn(*args, **kwargs) on the pool; 503 when the pool and its queue are full.
+
+        admitted=True skips that check, for follow-up jobs of work that was already
+        admitted once (e.g. later chunks of a response that has started streaming).
+        """
+        if not admitted and self._inflight >= self.max_workers + self.max_queue:
+            self.rejected.inc()
+            raise HTTPException(status_code=503, detail=f"Server busy ({self.name} pool saturated)",
+                                headers={"Retry-After": "1"})
+        if self._executor is None:
+            self.start()  # outside the app lifespan, e.g. scripts and benchmarks
+        call = functools.partial(fn, *args, **kwargs)
+        if self.kind == "thread":
+            queued = time.perf_counter()
+            call = functools.partial(self._timed, call, queued)
+        self._inflight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._inflight -= 1
+
+    def _timed(self, call, queued: float):
+        start = time.perf_counter()
+        self.wait_ms.observe((start - queued) * 1000)
+        try:
+            return call()
+        finally:
+            self.run_ms.observe((time.perf_counter() - start) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "rejected": self.rejected.value,
+            "wait_ms": self.wait_ms.snapshot(),
+            "run_ms": self.run_ms.snapshot(),
+        }
+
+
+class EndpointLimit:
+    """Concurrency cap for a group of endpoints, used as a FastAPI dependency.
+    Requests wait up to max_wait_s for a slot, then get 429.
+    """
+
+    def __init__(self, name: str, limit: int, max_wait_s: float):
+        self.name = name
+        self.limit = limit
+        self.max_wait_s = max_wait_s
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop = None
+        self._active = 0
+        self.rejected = metrics.counter(f"limit_{name}_rejected", f"Requests rejected by the {name} limit")
+
+    def _sem(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.limit), loop
+        return self._semaphore
+
+    async def __call__(self):
+        if self.limit <= 0:
+            yield
+            return
+        sem = self._sem()
+        try:
+            await asyncio.wait_for(sem.acquire(), self.max_wait_s)
+        except asyncio.TimeoutError:
+            self.rejected.inc()
+            raise HTTPException(status_code=429, detail=f"Too many concurrent {self.name} requests",
+                                headers={"Retry-After": "1"})
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            sem.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self._active, "rejected": self.rejected.value}
+
+
+def _preload_model():
+    from app.utils.model_loader import registry  # imported in the worker process
+    registry.get()
+
+
+cpu_pool = BoundedExecutor("cpu", settings.CPU_POOL_WORKERS, settings.CPU_POOL_QUEUE)
+process_pool = BoundedExecutor(
+    "process", settings.PROCESS_POOL_WORKERS, settings.PROCESS_POOL_QUEUE, kind="process",
+    initializer=_preload_model, start_method=settings.PROCESS_POOL_START_METHOD,
+)
+
+_limits: dict[str, EndpointLimit] = {}
+
+
+def limit(name: str, concurrency: int) -> EndpointLimit:
+    """Get or create the shared EndpointLimit for an endpoint group."""
+    if name not in _limits:
+        _limits[name] = EndpointLimit(name, concurrency, settings.ENDPOINT_LIMIT_WAIT_S)
+    return _limits[name]
+
+
+def start():
+    cpu_pool.start()
+    process_pool.start()
+
+
+def shutdown():
+    cpu_pool.shutdown()
+    process_pool.shutdown()
+
+
+def stats() -> dict:
+    return {
+        "pools": {p.name: p.stats() for p in (cpu_pool, process_pool) if p.enabled},
+        "limits": {name: lim.stats() for name, lim in _limits.items()},
+    }
@@ -0,0 +1,210 @@
+"""
+Shared outbound HTTP client pool with rate limiting, retries and a circuit breaker.
+
+One httpx.AsyncClient per upstream (tuned keep-alive, HTTP/2 when the `h2`
+package is installed) is opened in the app's startup hook and closed on
+shutdown. Each logical endpoint gets its own token bucket and latency
+histogram; idempotent GETs are retried with full-jitter exponential backoff.
+Buckets live in each process, so the Mapbox quotas are divided by the number
+of server workers (WEB_CONCURRENCY) to keep the host within them. After the
+breaker's reset timeout a single probe request is let through; the rest are
+rejected until it succeeds.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import h2  # noqa: F401  (only needed for http2=True)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimited(Exception):
+    """The local token bucket would make the caller wait longer than allowed."""
+
+
+class CircuitOpen(Exception):
+    """The upstream has failed repeatedly and calls are short-circuited."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: float):
+        self.rate = rate_per_s
+        self.capacity = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, max_wait: float):
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else 0.0
+            if wait > max_wait:
+                raise RateLimited(f"rate limit: would wait {wait:.2f}s")
+            # Reserve the token now; the sleep below covers the deficit
+            self._tokens -= 1.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at: float | None = None  # when the half-open probe was let through
+
+    @property
+    def state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        now = time.monotonic()
+        # One probe at a time; a probe that never reported back expires after reset_timeout
+        if self._probe_at is not None and now - self._probe_at < self.reset_timeout:
+            return False
+        self._probe_at = now
+        return True
+
+    def record(self, ok: bool):
+        self._probe_at = None
+        if ok:
+            self._failures = 0
+            return
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()  # (re)open; half-open probe failed too
+
+
+class HttpClientPool:
+    def __init__(self, name: str, rates_per_min: dict[str, float], *, http2: bool = True,
+                 max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 15.0, retries: int = 2,
+                 backoff_base: float = 0.2, backoff_cap: float = 2.0,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.name = name
+        self.http2 = http2 and HTTP2_AVAILABLE and transport is None
+        self.limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.transport = transport
+        self.buckets = {ep: TokenBucket(rate / 60.0, max(1.0, rate / 60.0)) for ep, rate in rates_per_min.items()}
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._client: httpx.AsyncClient | None = None
+        self.retried = metrics.counter(f"{name}_http_retries", f"{name} retried requests")
+        self.rejected = metrics.counter(f"{name}_http_rejected", f"{name} requests rejected by rate limit or breaker")
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, timeout=self.timeout, transport=self.transport,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _latency(self, endpoint: str) -> metrics.Histogram:
+        return metrics.histogram(f"{self.name}_{endpoint}_latency_ms", f"{self.name} {endpoint} latency (ms)")
+
+    def _backoff(self, attempt: int, resp: httpx.Response | None) -> float:
+        retry_after = resp.headers.get("retry-after") if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def get(self, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        """Idempotent GET with rate limiting, retries and circuit breaking.
+        Raises RateLimited / CircuitOpen, or the last httpx error after retries.
+        """
+        if self._client is None:
+            await self.start()  # outside the app lifespan, e.g. scripts
+        if not self.breaker.allow():
+            self.rejected.inc()
+            raise CircuitOpen(f"{self.name} circuit open")
+        bucket = self.buckets.get(endpoint)
+        hist = self._latency(endpoint)
+
+        for attempt in range(self.retries + 1):
+            if bucket is not None:
+                try:
+                    await bucket.acquire(max_wait=self.timeout.read or 0.0)
+                except RateLimited:
+                    self.rejected.inc()
+                    raise
+            t0 = time.perf_counter()
+            try:
+                resp = await self._client.get(url, **kwargs)
+            except (httpx.TimeoutException, httpx.TransportError):
+                hist.observe((time.perf_counter() - t0) * 1000)
+                self.breaker.record(False)
+                if attempt >= self.retries or self.breaker.state != "closed":
+                    raise
+                self.retried.inc()
+                await asyncio.sleep(self._backoff(attempt, None))
+                continue
+            hist.observe((time.perf_counter() - t0) * 1000)
+            ok = resp.status_code not in RETRY_STATUSES
+            self.breaker.record(ok)
+            if ok or attempt >= self.retries or self.breaker.state != "closed":
+                return resp
+            self.retried.inc()
+            await asyncio.sleep(self._backoff(attempt, resp))
+        return resp
+
+    def stats(self) -> dict:
+        return {
+            "http2": self.http2,
+            "circuit": self.breaker.state,
+            "retries": self.retried.value,
+            "rejected": self.rejected.value,
+            "latency_ms": {ep: self._latency(ep).snapshot() for ep in self.buckets},
+        }
+
+
+_workers = max(1, settings.WEB_CONCURRENCY)
+mapbox_http = HttpClientPool(
+    "mapbox",
+    {
+        "directions": settings.MAPBOX_DIRECTIONS_RATE_PER_MIN / _workers,
+        "geocoding": settings.MAPBOX_GEOCODING_RATE_PER_MIN / _workers,
+    },
+    http2=settings.MAPBOX_HTTP2,
+    max_connections=settings.MAPBOX_MAX_CONNECTIONS,
+    max_keepalive=settings.MAPBOX_MAX_KEEPALIVE,
+    keepalive_expiry=settings.MAPBOX_KEEPALIVE_EXPIRY_S,
+    connect_timeout=settings.MAPBOX_CONNECT_TIMEOUT_S,
+    read_timeout=settings.MAPBOX_READ_TIMEOUT_S,
+    retries=settings.MAPBOX_RETRIES,
+    breaker_threshold=settings.MAPBOX_BREAKER_THRESHOLD,
+    breaker_reset=settings.MAPBOX_BREAKER_RESET_S,
+)
@@ -0,0 +1,178 @@
+"""
+Request timing and on-demand profiling.
+
+TimingMiddleware is a plain ASGI middleware (no per-request task or body
+buffering) that records http_request_duration_ms by method, route template
+and status, adds a Server-Timing header and prints requests slower than
+SLOW_REQUEST_MS.
+
+When PROFILING_ENABLED is set, a request carrying `?profile=1` or an
+`X-Profile: 1` header (plus `X-Profile-Token` if PROFILING_TOKEN is
+configured) is run under pyinstrument, or under cProfile when pyinstrument
+is not installed. The report replaces the response body and is also written
+to PROFILE_DIR. cProfile sees the whole event loop thread, so only one
+request is profiled at a time; work handed to the worker pools shows up as
+time spent awaiting it. Profiled requests are still recorded in
+http_request_duration_ms, with the status the app produced. With profiling
+off, the only cost is one boolean check.
+"""
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+
+from app.core import metrics
+from app.core.config import settings
+
+PROFILE_DIR = settings.PROFILE_DIR or os.path.join(os.path.dirname(__file__), "..", "..", "profiles")
+_profile_seq = itertools.count(1)
+
+
+def _route_template(scope) -> str:
+    """Path template of the matched route (bounded label values), e.g. /api/v1/ev-profile/{user_id}."""
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    # Routes of included routers may carry only their own part; take the prefix from the request path
+    extra = scope["path"].count("/") - template.count("/")
+    if extra > 0:
+        template = "/".join(scope["path"].split("/")[:extra + 1]) + template
+    return template
+
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.slow_ms = settings.SLOW_REQUEST_MS
+        self.profiling = settings.PROFILING_ENABLED
+        self._histograms: dict = {}
+        self._profile_lock = threading.Lock()
+
+    def _histogram(self, method: str, route: str, status: int) -> metrics.Histogram:
+        key = (method, route, status)
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = metrics.histogram(
+                "http_request_duration_ms", "HTTP request latency (ms)",
+                labels={"method": method, "route": route, "status": status},
+            )
+        return hist
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.profiling and self._wants_profile(scope):
+            return await self._profiled(scope, receive, send)
+        return await self._timed(scope, receive, send)
+
+    def _observe(self, scope, status: int, elapsed: float):
+        route = _route_template(scope)
+        self._histogram(scope["method"], route, status).observe(elapsed)
+        if self.slow_ms and elapsed >= self.slow_ms:
+            print(f"Slow request: {scope['method']} {scope['path']} ({route}) -> {status} in {elapsed:.0f} ms")
+
+    async def _timed(self, scope, receive, send):
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                dur = (time.perf_counter() - t0) * 1000
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", f"app;dur={dur:.1f}".encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            self._observe(scope, status, (time.perf_counter() - t0) * 1000)
+
+    # -- profiling ---------------------------------------------------------
+
+    @staticmethod
+    def _header(scope, name: bytes) -> str | None:
+        for key, value in scope.get("headers") or ():
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    def _wants_profile(self, scope) -> bool:
+        query = scope.get("query_string", b"")
+        asked = b"profile=1" in query.split(b"&") or self._header(scope, b"x-profile") == "1"
+        if not asked:
+            return False
+        token = settings.PROFILING_TOKEN
+        return not token or self._header(scope, b"x-profile-token") == token
+
+    async def _profiled(self, scope, receive, send):
+        status = 500
+
+        async def discard(message):
+            nonlocal status  # the report replaces the real response; keep its status for metrics
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            from pyinstrument import Profiler  # optional dependency
+        except ImportError:
+            Profiler = None
+
+        t0 = time.perf_counter()
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+            report, media_type, ext = profiler.output_html(), "text/html", "html"
+        else:
+            if not self._profile_lock.acquire(blocking=False):
+                return await self._timed(scope, receive, send)  # another request is being profiled
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    profiler.disable()
+            finally:
+                self._profile_lock.release()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            report, media_type, ext = out.getvalue(), "text/plain", "txt"
+        elapsed = (time.perf_counter() - t0) * 1000
+        self._observe(scope, status, elapsed)
+
+        path = self._save(scope, report, ext)
+        print(f"Profiled {scope['method']} {scope['path']} in {elapsed:.0f} ms -> {path}")
+        body = report.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", f"{media_type}; charset=utf-8".encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"server-timing", f"app;dur={elapsed:.1f}".encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _save(scope, report: str, ext: str) -> str | None:
+        name = scope["path"].strip("/").replace("/", "_") or "root"
+        # pid + counter keep same-second profiles of one path from overwriting each other
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_seq)}"
+        path = os.path.join(PROFILE_DIR, f"{stamp}-{scope['method']}-{name}.{ext}")
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                f.write(report)
+        except OSError as e:
+            print(f"Could not write profile: {e}")
+            return None
+        return path
@@ -0,0 +1,74 @@
+"""
+Process lifecycle: preloading shared state before a pre-fork server forks,
+and the readiness report behind /health.
+
+Under gunicorn (see gunicorn.conf.py) the app is imported once in the master
+and preload() loads the model and the station snapshot there. It then
+gc.freeze()s everything allocated so far, so the collector never writes to
+those objects' headers and the pages stay shared copy-on-write across workers.
+Anything holding sockets, threads or file handles (worker pools, the Mongo
+client, the Mapbox HTTP client, the SQLite cache connection) is created per
+worker, in the app's startup hook, after the fork. Under plain uvicorn preload()
+never runs and the startup hook loads everything itself.
+"""
+import gc
+import os
+import time
+
+from app.core import database
+from app.core.config import settings
+from app.services.station_store import station_store
+from app.utils.model_loader import registry
+
+STARTED_AT = time.time()  # module import in the master, i.e. server start; inherited by forked workers
+_timings: dict = {}
+
+
+def preload():
+    """Load the model and stations in the current (master) process and freeze them for the GC."""
+    t0 = time.perf_counter()
+    registry.load()
+    try:
+        station_store.load()
+    except Exception as e:
+        print(f"Error preloading stations: {e}")
+    gc.unfreeze()  # on reload: let superseded objects be collected before refreezing
+    gc.collect()
+    gc.freeze()
+    _timings["preload_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    print(f"Preloaded model and stations in {_timings['preload_ms']} ms "
+          f"({gc.get_freeze_count()} objects frozen, pid {os.getpid()})")
+
+
+def worker_started(t0: float):
+    """Record how long this process's startup hook took (t0 from time.perf_counter())."""
+    _timings["worker_startup_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    _timings["worker_started_at"] = time.time()
+    print(f"Worker {os.getpid()} started in {_timings['worker_startup_ms']} ms")
+
+
+async def readiness() -> dict:
+    """Model, stations and MongoDB status, and how long the server took to become ready."""
+    model, stations = registry.info(), station_store.stats()
+    checks = {
+        "model": registry.ready,
+        "stations": stations["loaded"],
+        "mongo": await database.ping_db(settings.HEALTH_MONGO_TIMEOUT_S),
+    }
+    ready = all(checks.values())
+    startup = {"started_at": STARTED_AT, **_timings}
+    if ready:
+        # Ready once the last component was in place (for preloaded ones, before the fork)
+        ready_at = max(model.get("loaded_at", 0), stations.get("loaded_at", 0),
+                       _timings.get("worker_started_at", 0))
+        startup["ready_after_ms"] = round((ready_at - STARTED_AT) * 1000, 2)
+    return {
+        "status": "ready" if ready else "starting",
+        "ready": ready,
+        "checks": checks,
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+        "model_version": registry.version,
+        "stations": stations.get("stations"),
+        "startup": startup,
+    }
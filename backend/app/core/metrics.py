@@ -0,0 +1,173 @@
+"""
+Lightweight in-process metrics: counters and fixed-bucket histograms.
+Metrics are registered by name (plus optional labels) so any module can look
+up the same instance. `span(name)` times a block into the shared
+span_duration_ms histogram, and render_prometheus() exports everything in the
+Prometheus text format for /metrics.
+"""
+import bisect
+import re
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+Labels = tuple  # sorted ((key, value), ...) pairs
+
+
+def _labels(labels: Optional[dict]) -> Labels:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items())) if labels else ()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+                 labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts keyed by upper bound, Prometheus-style."""
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, n in zip(list(self.buckets) + ["+Inf"], counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {"count": count, "sum": round(total, 3), "buckets": cumulative}
+
+
+_registry: Dict[tuple, object] = {}  # (name, labels) -> metric
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help: str = "", labels: Optional[dict] = None) -> Counter:
+    key = (name, _labels(labels))
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = Counter(name, help, key[1])
+        return _registry[key]
+
+
+def histogram(name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+              labels: Optional[dict] = None) -> Histogram:
+    key = (name, _labels(labels))
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = Histogram(name, help, buckets, key[1])
+        return _registry[key]
+
+
+_spans: Dict[str, Histogram] = {}
+
+
+class span:
+    """Context manager timing a block into span_duration_ms{span=name}.
+
+        with metrics.span("model_predict"):
+            ...
+
+    Costs two perf_counter() calls and one observe(); safe in threads and tasks.
+    """
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, name: str):
+        hist = _spans.get(name)
+        if hist is None:
+            hist = _spans[name] = histogram("span_duration_ms", "Time spent in instrumented code paths (ms)",
+                                            labels={"span": name})
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe((time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+def _series_name(name: str, labels: Labels) -> str:
+    return name + "".join(f"[{k}={v}]" for k, v in labels)
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {_series_name(m.name, m.labels): m.snapshot() for m in metrics}
+
+
+_INVALID = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def _prom_labels(labels: Labels, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: (m.name, m.labels))
+    lines, seen = [], set()
+    for m in metrics:
+        name = _INVALID.sub("_", m.name)
+        if name not in seen:
+            seen.add(name)
+            if m.help:
+                lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {m.kind}")
+        if m.kind == "counter":
+            lines.append(f"{name}{_prom_labels(m.labels)} {m.value}")
+            continue
+        snap = m.snapshot()
+        for bound, n in snap["buckets"].items():
+            lines.append(f"{name}_bucket{_prom_labels(m.labels, (('le', bound),))} {n}")
+        lines.append(f"{name}_sum{_prom_labels(m.labels)} {snap['sum']}")
+        lines.append(f"{name}_count{_prom_labels(m.labels)} {snap['count']}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,13 @@
+import time
 from fastapi import FastAPI
-from app.api.v1.endpoints import prediction
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.v1.endpoints import prediction, route
 from app.core.database import init_db, close_db
+from app.services.station_store import station_store
+from app.utils.model_loader import registry
+from app.core.http import mapbox_http
+from app.core import executors, lifecycle, metrics
+from app.core.instrumentation import TimingMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -12,12 +19,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TimingMiddleware)
 app.include_router(prediction.router, prefix="/api/v1")
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Readiness: 200 once the model, stations and MongoDB are all available, else 503."""
+    report = await lifecycle.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 @app.on_event("startup")
 async def startup_event():
+    # Runs in every worker after the fork; under gunicorn the model and
+    # stations were already preloaded by the master and these loads are no-ops.
+    t0 = time.perf_counter()
+    executors.start()
+    registry.load_in_background()
+    try:
+        station_store.load()
+    except Exception as e:
+        print(f"Error loading stations: {e}")
+    await mapbox_http.start()
     await init_db()
+    lifecycle.worker_started(t0)
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    await close_db()
\ No newline at end of file
+    await route.mapbox_service.close()  # HTTP pool and the SQLite cache connection
+    await close_db()
+    executors.shutdown()
\ No newline at end of file
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
+from app.core.config import settings
 
 class BatteryInput(BaseModel):
     # original fields
@@ -45,3 +46,16 @@ class BatteryInput(BaseModel):
 class RouteRequest(BatteryInput):
     start_location: str  # "lat,lon" or "Address"
     end_location: str    # "lat,lon" or "Address"
+
+
+class SweepRange(BaseModel):
+    # `steps` evenly spaced values from start to stop, both included
+    start: float
+    stop: float
+    steps: int = Field(..., ge=1, le=settings.SWEEP_MAX_POINTS)
+
+
+class SweepRequest(BaseModel):
+    base: BatteryInput
+    # BatteryInput field -> explicit values or a range; the sweep is their Cartesian product
+    grid: Dict[str, Union[List[float], SweepRange]]
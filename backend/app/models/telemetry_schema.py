@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class TelemetryPoint(BaseModel):
+    vehicle_id: str
+    ts: Optional[float] = None                 # epoch seconds; server time when omitted
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    speed_kmph: Optional[float] = Field(None, ge=0)
+    soc_percent: float = Field(..., ge=0, le=100)
+    # Vehicle constants; sent once (e.g. with the first point) and remembered
+    battery_capacity_kwh: Optional[float] = Field(None, gt=0)
+    efficiency_km_per_kwh: Optional[float] = Field(None, gt=0)
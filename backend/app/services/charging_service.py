@@ -1,80 +1,243 @@
-import os
-import zipfile
-import pandas as pd
-from app.utils.geo import haversine
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.services.station_filters import FilterIndex, StationFilter
+from app.services.station_store import station_store, StationSnapshot
+from app.utils.geo import haversine_batch, lonlat_to_mercator
+from app.utils.http_cache import EncodedPayload
 from fastapi import HTTPException
+import numpy as np
+
+
+def _wrap_lon(lon: float) -> float:
+    """Longitude folded into [-180, 180], e.g. 190 -> -170 for a map showing a world copy."""
+    if -180.0 <= lon <= 180.0:
+        return lon
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def _plain(values: np.ndarray) -> list:
+    """float32 column -> list of Python floats without float32 noise (0.27, not 0.2700000107)."""
+    return np.round(values.astype(np.float64), 4).tolist()
 
-# Relative path from services directory to the data file
-STATIONS_ZIP_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "ML_Models", "EV-charging-station.zip")
 
 class ChargingService:
-    def _load_stations_df(self) -> pd.DataFrame:
-        zip_path = os.path.abspath(STATIONS_ZIP_PATH)
-        if not os.path.exists(zip_path):
-            raise FileNotFoundError(f"Stations zip not found at: {zip_path}")
-        with zipfile.ZipFile(zip_path, "r") as z:
-            csv_names = [n for n in z.namelist() if n.endswith(".csv")]
-            if not csv_names:
-                raise ValueError("No CSV file found inside the zip archive")
-            with z.open(csv_names[0]) as f:
-                df = pd.read_csv(f)
-        df.columns = [c.strip() for c in df.columns]
-        return df
-
-    def get_charging_stations(self):
+    def __init__(self, store=station_store):
+        self.store = store
+        self._geojson: tuple[int, EncodedPayload] | None = None  # (dataset version, payload)
+        self._geojson_lock = threading.Lock()
+        self._tiles: OrderedDict = OrderedDict()  # (version, z, x, y) -> EncodedPayload
+        self._tiles_lock = threading.Lock()
+        self._filter_index: FilterIndex | None = None
+        self._masks: OrderedDict = OrderedDict()  # (version, StationFilter) -> bool mask
+        self._masks_lock = threading.Lock()
+
+    def _snapshot(self) -> StationSnapshot:
         try:
-            df = self._load_stations_df()
+            return self.store.get()
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Stations load error: {e}")
 
-        features = []
-        for _, row in df.iterrows():
-            try:
-                lat = float(row.get("Latitude", row.get("latitude", 0)))
-                lon = float(row.get("Longitude", row.get("longitude", 0)))
-                if lat == 0 and lon == 0: continue
-            except: continue
+    def get_charging_stations_payload(self) -> EncodedPayload:
+        """The full FeatureCollection, serialized and compressed once per dataset version."""
+        snap = self._snapshot()
+        cached = self._geojson
+        if cached is not None and cached[0] == snap.version:
+            return cached[1]
+        with self._geojson_lock:
+            if self._geojson is None or self._geojson[0] != snap.version:
+                self._geojson = (snap.version, EncodedPayload.from_obj(
+                    {"type": "FeatureCollection", "features": self._point_features(snap)}
+                ))
+            return self._geojson[1]
+
+    def _filter_mask(self, snap: StationSnapshot, filt: StationFilter | None) -> np.ndarray | None:
+        """Cached boolean mask for filt, or None when nothing is filtered."""
+        if filt is None or not filt.active:
+            return None
+        key = (snap.version, filt)
+        with self._masks_lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+            index = self._filter_index
+            if index is None or index.version != snap.version:
+                index = self._filter_index = FilterIndex(snap)
+        mask = index.mask(filt)
+        with self._masks_lock:
+            self._masks[key] = mask
+            while len(self._masks) > settings.STATION_FILTER_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def get_charging_stations(self, bbox=None, zoom=None, filt: StationFilter | None = None):
+        """All stations, or only those inside bbox = (min_lon, min_lat, max_lon, max_lat).
+        Longitudes outside [-180, 180] are wrapped; min_lon > max_lon after wrapping
+        means the box crosses the antimeridian. Below STATION_CLUSTER_MAX_ZOOM nearby
+        stations are merged into cluster features.
+        """
+        snap = self._snapshot()
+        mask = self._filter_mask(snap, filt)
+        if bbox is None:
+            idx = None if mask is None else np.flatnonzero(mask)
+            return {"type": "FeatureCollection", "features": self._clustered_features(snap, idx, zoom)}
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if max_lon - min_lon >= 360.0:
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            min_lon, max_lon = _wrap_lon(min_lon), _wrap_lon(max_lon)
+        x0, y1 = lonlat_to_mercator(min_lon, min_lat)
+        x1, y0 = lonlat_to_mercator(max_lon, max_lat)
+        # max edge is inclusive for bbox queries
+        idx = snap.in_box(float(x0), float(y0), np.nextafter(float(x1), 2), np.nextafter(float(y1), 2))
+        if mask is not None:
+            idx = idx[mask[idx]]
+        return {"type": "FeatureCollection", "features": self._clustered_features(snap, idx, zoom)}
 
+    def get_tile(self, z: int, x: int, y: int, filt: StationFilter | None = None) -> EncodedPayload:
+        """GeoJSON tile z/x/y (XYZ scheme), cached per dataset version and filter in an LRU."""
+        n = 1 << z
+        if not (0 <= x < n and 0 <= y < n):
+            raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+        snap = self._snapshot()
+        if filt is not None and not filt.active:
+            filt = None
+        key = (snap.version, z, x, y, filt)
+        with self._tiles_lock:
+            payload = self._tiles.get(key)
+            if payload is not None:
+                self._tiles.move_to_end(key)
+                return payload
+
+        idx = snap.in_box(x / n, y / n, (x + 1) / n, (y + 1) / n)
+        mask = self._filter_mask(snap, filt)
+        if mask is not None:
+            idx = idx[mask[idx]]
+        payload = EncodedPayload.from_obj(
+            {"type": "FeatureCollection", "features": self._clustered_features(snap, idx, z)}
+        )
+        with self._tiles_lock:
+            self._tiles[key] = payload
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > settings.STATION_TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return payload
+
+    def _clustered_features(self, snap: StationSnapshot, idx, zoom) -> list:
+        """Grid clustering on Web Mercator cells of 1/STATION_CLUSTER_CELLS_PER_TILE of a tile."""
+        if idx is None:
+            idx = np.arange(len(snap))
+        if zoom is None or zoom >= settings.STATION_CLUSTER_MAX_ZOOM or len(idx) == 0:
+            return self._point_features(snap, idx)
+
+        n_cells = (1 << int(zoom)) * settings.STATION_CLUSTER_CELLS_PER_TILE
+        cx = np.minimum((snap.merc_x[idx] * n_cells).astype(np.int64), n_cells - 1)
+        cy = np.minimum((snap.merc_y[idx] * n_cells).astype(np.int64), n_cells - 1)
+        keys, inverse, counts = np.unique(cx * n_cells + cy, return_inverse=True, return_counts=True)
+
+        features = self._point_features(snap, idx[counts[inverse] == 1])
+        multi = np.flatnonzero(counts > 1)
+        if len(multi) == 0:
+            return features
+        lat = np.bincount(inverse, weights=snap.lat[idx])[multi] / counts[multi]
+        lon = np.bincount(inverse, weights=snap.lon[idx])[multi] / counts[multi]
+        cost = np.bincount(inverse, weights=snap.cost[idx])[multi] / counts[multi]
+        rating = np.bincount(inverse, weights=snap.rating[idx])[multi] / counts[multi]
+        for key, n, la, lo, c, r in zip(
+            keys[multi].tolist(), counts[multi].tolist(), lat.tolist(), lon.tolist(),
+            np.round(cost, 4).tolist(), np.round(rating, 4).tolist(),
+        ):
             features.append({
                 "type": "Feature",
                 "properties": {
-                    "station_id": str(row.get("Station ID", "")),
-                    "rating": float(row.get("Reviews (Rating)", 0) or 0),
-                    "cost": float(row.get("Cost (USD/kWh)", 0) or 0),
+                    "cluster": True,
+                    "cluster_id": key,
+                    "point_count": n,
+                    "avg_cost": c,
+                    "avg_rating": r,
+                },
+                "geometry": {"type": "Point", "coordinates": [round(lo, 6), round(la, 6)]}
+            })
+        return features
+
+    def _point_features(self, snap: StationSnapshot, idx=None) -> list:
+        if idx is None:
+            idx = slice(None)
+        features = []
+        for sid, lat, lon, rating, cost in zip(
+            snap.ids[idx].tolist(), snap.lat[idx].tolist(), snap.lon[idx].tolist(),
+            _plain(snap.rating[idx]), _plain(snap.cost[idx]),
+        ):
+            features.append({
+                "type": "Feature",
+                "properties": {
+                    "station_id": sid,
+                    "rating": rating,
+                    "cost": cost,
                 },
                 "geometry": {"type": "Point", "coordinates": [lon, lat]}
             })
-        return {"type": "FeatureCollection", "features": features}
+        return features
 
-    def get_best_station(self, vehicle_lat, vehicle_lon, battery_percent, battery_capacity, efficiency):
+    def _station_dict(self, snap: StationSnapshot, i: int, dist: float, remaining_range: float) -> dict:
+        return {
+            "station_id": str(snap.ids[i]),
+            "latitude": float(snap.lat[i]),
+            "longitude": float(snap.lon[i]),
+            "distance_km": round(float(dist), 2),
+            "rating": round(float(snap.rating[i]), 4),
+            "cost": round(float(snap.cost[i]), 4),
+            "remaining_range_km": round(remaining_range, 2),
+        }
+
+    def get_best_station(self, vehicle_lat, vehicle_lon, battery_percent, battery_capacity, efficiency,
+                         k=None, sort_by="distance", filt: StationFilter | None = None):
+        """Best reachable station, or the top-k reachable ones when k is given.
+
+        Candidates come from a BallTree range query bounded by the remaining
+        range, intersected with the filter mask; sort_by ranks them by
+        'distance', 'cost' (cheapest first) or 'rating' (best first), ties
+        broken by distance. Without k the first-ranked station is returned.
+        """
         remaining_range = (battery_percent / 100.0) * battery_capacity * efficiency
-        try:
-            df = self._load_stations_df()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Stations load error: {e}")
+        snap = self._snapshot()
+        if len(snap) == 0 or remaining_range <= 0:
+            raise HTTPException(status_code=404, detail="No reachable station found.")
+
+        vlat, vlon = np.radians(vehicle_lat), np.radians(vehicle_lon)
+        mask = self._filter_mask(snap, filt)
 
-        best = None
-        best_dist = float("inf")
-
-        for _, row in df.iterrows():
-            try:
-                lat, lon = float(row["Latitude"]), float(row["Longitude"])
-                if lat == 0 and lon == 0: continue
-            except: continue
-
-            dist = haversine(vehicle_lat, vehicle_lon, lat, lon)
-            if dist <= remaining_range and dist < best_dist:
-                best_dist = dist
-                best = {
-                    "station_id": str(row["Station ID"]),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "distance_km": round(dist, 2),
-                    "rating": float(row["Reviews (Rating)"] or 0),
-                    "cost": float(row["Cost (USD/kWh)"] or 0),
-                    "remaining_range_km": round(remaining_range, 2),
-                }
-
-        if not best:
+        if k is None and mask is None and sort_by == "distance":
+            # Plain nearest station: one k=1 tree query instead of a range query
+            i, _ = snap.nearest(vehicle_lat, vehicle_lon)
+            dist = haversine_batch(vlat, vlon, snap.lat_rad[i], snap.lon_rad[i])
+            if dist > remaining_range:
+                raise HTTPException(status_code=404, detail="No reachable station found.")
+            return self._station_dict(snap, i, dist, remaining_range)
+
+        idx, _ = snap.within(vehicle_lat, vehicle_lon, remaining_range)
+        if mask is not None:
+            idx = idx[mask[idx]]
+        if len(idx) == 0:
             raise HTTPException(status_code=404, detail="No reachable station found.")
-        return best
\ No newline at end of file
+        dist = haversine_batch(vlat, vlon, snap.lat_rad[idx], snap.lon_rad[idx])
+        if sort_by == "cost":
+            order = np.lexsort((dist, snap.cost[idx]))
+        elif sort_by == "rating":
+            order = np.lexsort((dist, -snap.rating[idx]))
+        else:
+            order = np.argsort(dist, kind="stable")
+        if k is None:
+            j = int(order[0])
+            return self._station_dict(snap, int(idx[j]), dist[j], remaining_range)
+        order = order[:k]
+        return {
+            "remaining_range_km": round(remaining_range, 2),
+            "sort_by": sort_by,
+            "stations": [self._station_dict(snap, int(idx[j]), dist[j], remaining_range) for j in order],
+        }
+
+
+# One per process, shared by the charging endpoints and the telemetry hub
+charging_service = ChargingService()
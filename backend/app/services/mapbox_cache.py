@@ -0,0 +1,192 @@
+"""
+MapboxCache — two-tier cache for Mapbox geocoding and directions responses.
+
+Tier 1 is an in-process LRU, tier 2 an on-disk SQLite table shared by every
+worker on the host. Entries expire after a per-namespace TTL. Concurrent
+misses for the same key share one upstream call (single-flight); the call
+runs as its own task and is only cancelled once every waiter has gone.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.core import metrics
+
+
+def normalize_place(location: str) -> str:
+    """Case/whitespace-insensitive key for a free-text place name."""
+    return " ".join(location.lower().replace(",", " , ").split()).replace(" ,", ",")
+
+
+def round_lonlat(lonlat: str, precision: int) -> str:
+    """'lon,lat' rounded to `precision` decimals (4 ~ 11 m)."""
+    lon, lat = (float(v) for v in lonlat.split(","))
+    return f"{round(lon, precision)},{round(lat, precision)}"
+
+
+class _DiskStore:
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily and per process so a pre-forked server never shares a handle
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mapbox_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires FROM mapbox_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, 0.0
+            if row[1] < time.time():
+                conn.execute("DELETE FROM mapbox_cache WHERE key = ?", (key,))
+                return None, 0.0
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, expires: float):
+        payload = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO mapbox_cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, payload, expires),
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class MapboxCache:
+    def __init__(self, db_path: str | None, memory_size: int = 2048):
+        self.memory_size = memory_size
+        self._memory: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._disk = _DiskStore(db_path) if db_path else None
+        self._inflight: dict[str, _Flight] = {}
+        self.memory_hits = metrics.counter("mapbox_cache_memory_hits", "Mapbox cache hits served from memory")
+        self.disk_hits = metrics.counter("mapbox_cache_disk_hits", "Mapbox cache hits served from SQLite")
+        self.misses = metrics.counter("mapbox_cache_misses", "Mapbox cache misses (upstream calls)")
+        self.coalesced = metrics.counter("mapbox_cache_coalesced", "Requests that joined an in-flight upstream call")
+        self.upstream_ms = metrics.histogram("mapbox_upstream_ms", "Mapbox upstream latency (ms)")
+
+    def _memory_get(self, key: str):
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        if item[0] < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return item[1]
+
+    def _memory_set(self, key: str, value, expires: float):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable],
+                           cacheable: Callable[[object], bool] | None = None):
+        """Return the cached value for key, or call fetch() once and cache the result.
+
+        A result is cached when it is not None and, if given, cacheable(result) is true.
+        """
+        value = self._memory_get(key)
+        if value is not None:
+            self.memory_hits.inc()
+            return value
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._lookup_or_fetch(key, ttl, fetch, cacheable))
+            flight = self._inflight[key] = _Flight(task)
+            task.add_done_callback(lambda t: self._landed(key, flight))
+        else:
+            self.coalesced.inc()
+
+        flight.waiters += 1
+        try:
+            # Shielded so one disconnecting client doesn't cancel the fetch for the rest
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]  # a later caller starts afresh
+                flight.task.cancel()
+
+    def _landed(self, key: str, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # mark retrieved when every waiter already left
+
+    async def _lookup_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable],
+                               cacheable: Callable[[object], bool] | None):
+        if self._disk is not None:
+            try:
+                value, expires = await asyncio.to_thread(self._disk.get, key)
+            except sqlite3.Error as e:  # disk tier is best-effort
+                print(f"Mapbox cache read error: {e}")
+                value = None
+            if value is not None:
+                self.disk_hits.inc()
+                self._memory_set(key, value, expires)
+                return value
+
+        self.misses.inc()
+        t0 = time.perf_counter()
+        value = await fetch()
+        self.upstream_ms.observe((time.perf_counter() - t0) * 1000)
+        if value is not None and (cacheable is None or cacheable(value)):
+            expires = time.time() + ttl
+            self._memory_set(key, value, expires)
+            if self._disk is not None:
+                try:
+                    await asyncio.to_thread(self._disk.set, key, value, expires)
+                except sqlite3.Error as e:
+                    print(f"Mapbox cache write error: {e}")
+        return value
+
+    def stats(self) -> dict:
+        mem, disk, miss = self.memory_hits.value, self.disk_hits.value, self.misses.value
+        total = mem + disk + miss
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": mem,
+            "disk_hits": disk,
+            "misses": miss,
+            "coalesced": self.coalesced.value,
+            "hit_ratio": round((mem + disk) / total, 4) if total else 0.0,
+            "upstream_ms": self.upstream_ms.snapshot(),
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
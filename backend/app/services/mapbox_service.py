@@ -5,57 +5,104 @@ Extracted from prediction.py (RouteOptimizer class).
 import httpx
 from fastapi import HTTPException
 from urllib.parse import quote
+from app.core import metrics
+from app.core.http import HttpClientPool, CircuitOpen, RateLimited, mapbox_http
+from app.services.mapbox_cache import MapboxCache, normalize_place, round_lonlat
+
+
+def _has_route(body: dict) -> bool:
+    """Only successful lookups with at least one route are worth caching."""
+    return body.get("code") == "Ok" and bool(body.get("routes"))
 
 
 class MapboxService:
-    def __init__(self, token: str):
+    def __init__(self, token: str, base_url: str = "https://api.mapbox.com",
+                 cache: MapboxCache | None = None, coord_precision: int = 4,
+                 geocode_ttl: float = 30 * 86400, directions_ttl: float = 86400,
+                 http: HttpClientPool = mapbox_http):
         self.token = token
-        self._client = httpx.AsyncClient(timeout=30.0)
+        self.base_url = base_url.rstrip("/")
+        self.http = http
+        self.cache = cache
+        self.coord_precision = coord_precision
+        self.geocode_ttl = geocode_ttl
+        self.directions_ttl = directions_ttl
 
     async def get_directions(self, start: str, end: str) -> dict:
         """Call Mapbox Directions API.
         start/end must be 'lon,lat' strings (Mapbox format).
         Returns the raw Mapbox directions JSON.
         """
+        if self.cache is None:
+            return await self._fetch_directions(start, end)
+        key = "dir:" + round_lonlat(start, self.coord_precision) + ";" + round_lonlat(end, self.coord_precision)
+        return await self.cache.get_or_fetch(
+            key, self.directions_ttl, lambda: self._fetch_directions(start, end), cacheable=_has_route
+        )
+
+    async def _fetch_directions(self, start: str, end: str) -> dict:
         if not self.token:
             raise HTTPException(status_code=500, detail="Mapbox token not configured")
 
-        url = f"https://api.mapbox.com/directions/v5/mapbox/driving/{start};{end}"
+        url = f"{self.base_url}/directions/v5/mapbox/driving/{start};{end}"
         params = {
             "access_token": self.token,
             "geometries": "geojson",
             "steps": "true",
             "alternatives": "true",
             "overview": "full",
+            "annotations": "speed",
         }
         try:
-            resp = await self._client.get(url, params=params)
+            with metrics.span("mapbox_directions"):
+                resp = await self.http.get("directions", url, params=params)
             if resp.status_code != 200:
                 raise HTTPException(status_code=resp.status_code, detail="Mapbox Directions API error")
             return resp.json()
+        except RateLimited:
+            raise HTTPException(status_code=429, detail="Mapbox rate limit reached, retry shortly")
+        except CircuitOpen:
+            raise HTTPException(status_code=503, detail="Mapbox temporarily unavailable")
         except httpx.TimeoutException:
             raise HTTPException(status_code=408, detail="Mapbox API request timed out")
         except httpx.RequestError as e:
             raise HTTPException(status_code=500, detail=f"Mapbox request error: {e}")
 
     async def geocode(self, location: str) -> str | None:
-        """Geocode a place name and return 'lon,lat' string, or None on failure."""
+        """Geocode a place name and return 'lon,lat' string, or None if no place matched."""
+        if self.cache is None:
+            return await self._fetch_geocode(location)
+        key = "geo:" + normalize_place(location)
+        return await self.cache.get_or_fetch(key, self.geocode_ttl, lambda: self._fetch_geocode(location))
+
+    async def _fetch_geocode(self, location: str) -> str | None:
         if not self.token:
             raise HTTPException(status_code=500, detail="Mapbox token not configured")
 
         encoded = quote(location)
-        url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{encoded}.json"
+        url = f"{self.base_url}/geocoding/v5/mapbox.places/{encoded}.json"
         params = {"access_token": self.token, "limit": 1}
         try:
-            resp = await self._client.get(url, params=params)
-            if resp.status_code == 200:
-                features = resp.json().get("features")
-                if features:
-                    center = features[0]["center"]
-                    return f"{center[0]},{center[1]}"
-        except Exception as e:
-            print(f"Geocode error: {e}")
-        return None
+            with metrics.span("mapbox_geocode"):
+                resp = await self.http.get("geocoding", url, params=params)
+        except RateLimited:
+            raise HTTPException(status_code=429, detail="Mapbox rate limit reached, retry shortly")
+        except CircuitOpen:
+            raise HTTPException(status_code=503, detail="Mapbox temporarily unavailable")
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=408, detail="Mapbox API request timed out")
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=500, detail=f"Mapbox request error: {e}")
+        if resp.status_code != 200:
+            raise HTTPException(status_code=resp.status_code, detail="Mapbox Geocoding API error")
+        # Only an answer with no matching place means "unknown location"
+        features = resp.json().get("features")
+        if not features:
+            return None
+        center = features[0]["center"]
+        return f"{center[0]},{center[1]}"
 
     async def close(self):
-        await self._client.aclose()
+        await self.http.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -2,11 +2,51 @@
 ModelService — wraps the ML model for input preparation and prediction.
 Extracted from prediction.py.
 """
+import asyncio
+import operator
+import numpy as np
 import pandas as pd
-from app.utils.model_loader import model
+from app.core import metrics
+from app.core.config import settings
+from app.core.executors import cpu_pool
+from app.utils.model_loader import registry
+from app.services.prediction_cache import prediction_cache
 from app.models.schema import BatteryInput
 from fastapi import HTTPException
 
+# Column order the model was trained on.
+FEATURE_COLUMNS = [
+    'Battery_Capacity_kWh', 'Vehicle_Age_Months', 'Total_Charging_Cycles',
+    'Avg_Temperature_C', 'Fast_Charge_Ratio', 'Avg_Discharge_Rate_C',
+    'Internal_Resistance_Ohm', 'SoH_Percent',
+    'Car_Model_Ford Mustang Mach-E', 'Car_Model_Hyundai Ioniq 5',
+    'Car_Model_Tesla Model 3', 'Car_Model_Wuling Air EV',
+    'Battery_Type_NMC', 'Driving_Style_Conservative',
+    'Driving_Style_Moderate', 'Battery_Status_Replace Required',
+    'Vehicle_Weight_kg', 'Drag_Coefficient', 'Frontal_Area_m2',
+    'Rolling_Resistance_Coeff', 'Motor_Efficiency', 'Trip_Distance_km',
+    'Elevation_Gain_m', 'Traffic_Index', 'Avg_Speed_kmph',
+    'Humidity_Percent', 'Wind_Speed_mps', 'Energy_Consumed_kWh',
+    'Estimated_Range_km', 'Consumption_kWh_per_km',
+]
+
+# BatteryInput attribute feeding each model column; None means the column is
+# a training-time target and is always sent as 0.
+FEATURE_FIELDS = [
+    'Battery_Capacity_kWh', 'Vehicle_Age_Months', 'Total_Charging_Cycles',
+    'Avg_Temperature_C', 'Fast_Charge_Ratio', 'Avg_Discharge_Rate_C',
+    'Internal_Resistance_Ohm', 'SoH_Percent',
+    'Car_Model_Ford_Mustang_Mach_E', 'Car_Model_Hyundai_Ioniq_5',
+    'Car_Model_Tesla_Model_3', 'Car_Model_Wuling_Air_EV',
+    'Battery_Type_NMC', 'Driving_Style_Conservative',
+    'Driving_Style_Moderate', 'Battery_Status_Replace_Required',
+    'Vehicle_Weight_kg', 'Drag_Coefficient', 'Frontal_Area_m2',
+    'Rolling_Resistance_Coeff', 'Motor_Efficiency', 'Trip_Distance_km',
+    'Elevation_Gain_m', 'Traffic_Index', 'Avg_Speed_kmph',
+    'Humidity_Percent', 'Wind_Speed_mps', None,
+    None, None,
+]
+
 
 def data_to_dataframe(data: BatteryInput) -> pd.DataFrame:
     """Convert a BatteryInput (or RouteRequest) into a DataFrame the model expects."""
@@ -48,30 +88,244 @@ def data_to_dataframe(data: BatteryInput) -> pd.DataFrame:
         'Consumption_kWh_per_km': 0,
     }
 
-    cols = [
-        'Battery_Capacity_kWh', 'Vehicle_Age_Months', 'Total_Charging_Cycles',
-        'Avg_Temperature_C', 'Fast_Charge_Ratio', 'Avg_Discharge_Rate_C',
-        'Internal_Resistance_Ohm', 'SoH_Percent',
-        'Car_Model_Ford Mustang Mach-E', 'Car_Model_Hyundai Ioniq 5',
-        'Car_Model_Tesla Model 3', 'Car_Model_Wuling Air EV',
-        'Battery_Type_NMC', 'Driving_Style_Conservative',
-        'Driving_Style_Moderate', 'Battery_Status_Replace Required',
-        'Vehicle_Weight_kg', 'Drag_Coefficient', 'Frontal_Area_m2',
-        'Rolling_Resistance_Coeff', 'Motor_Efficiency', 'Trip_Distance_km',
-        'Elevation_Gain_m', 'Traffic_Index', 'Avg_Speed_kmph',
-        'Humidity_Percent', 'Wind_Speed_mps', 'Energy_Consumed_kWh',
-        'Estimated_Range_km', 'Consumption_kWh_per_km',
-    ]
-
-    return pd.DataFrame([input_dict])[cols]
+    return pd.DataFrame([input_dict])[FEATURE_COLUMNS]
 
 
 def run_prediction(data: BatteryInput) -> list:
     """Run the ML model and return raw prediction list."""
+    model, version = registry.current()
     if not model:
         raise HTTPException(status_code=500, detail="Model not loaded")
+    with metrics.span("feature_encode"):
+        row = encoder.encode(data)
+    row, key, cached = _cache_lookup(row, version)
+    if cached is not None:
+        return cached
+    try:
+        result = _predict_matrix(row[np.newaxis, :], model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if key is not None:
+        prediction_cache.set(key, result)
+    return result
+
+
+def _cache_lookup(row: np.ndarray, version: str | None):
+    """Return (row to predict on, cache key, cached result or None)."""
+    if not settings.PREDICTION_CACHE_ENABLED:
+        return row, None, None
+    row = prediction_cache.normalize(row)
+    key = prediction_cache.key(row, version)
+    return row, key, prediction_cache.get(key)
+
+
+class FeatureEncoder:
+    """Precompiled BatteryInput -> model row encoder.
+
+    Writes attribute values straight into a float64 row (or a row of a batch
+    buffer) in FEATURE_COLUMNS order, skipping the dict + DataFrame round trip
+    of data_to_dataframe. Unset optional fields become 0, as before.
+    """
+
+    def __init__(self, columns=FEATURE_COLUMNS, fields=FEATURE_FIELDS):
+        self.columns = list(columns)
+        slots = [(j, f) for j, f in enumerate(fields) if f is not None]
+        self._index = np.array([j for j, _ in slots], dtype=np.intp)
+        self._get = operator.attrgetter(*[f for _, f in slots])
+        self._optional = np.array([
+            j for j, f in slots
+            if not BatteryInput.model_fields[f].is_required()
+        ], dtype=np.intp)
+
+    def encode_into(self, data: BatteryInput, out: np.ndarray) -> np.ndarray:
+        out[self._index] = self._get(data)  # None -> nan
+        if self._optional.size:
+            opt = out[self._optional]
+            out[self._optional] = np.where(np.isnan(opt), 0.0, opt)
+        return out
+
+    def encode(self, data: BatteryInput) -> np.ndarray:
+        return self.encode_into(data, np.zeros(len(self.columns), dtype=np.float64))
+
+    def encode_many(self, items: list[BatteryInput], out: np.ndarray | None = None) -> np.ndarray:
+        if out is None:
+            out = np.zeros((len(items), len(self.columns)), dtype=np.float64)
+        if items:
+            out[:, self._index] = np.array([self._get(d) for d in items], dtype=np.float64)
+            if self._optional.size:
+                opt = out[:, self._optional]
+                out[:, self._optional] = np.where(np.isnan(opt), 0.0, opt)
+        return out
+
+    def matches(self, model) -> bool:
+        """True if the model was fitted without feature names or with exactly ours."""
+        names = getattr(model, "feature_names_in_", None)
+        return names is None or list(names) == self.columns
+
+
+encoder = FeatureEncoder()
+
+
+def inputs_to_matrix(items: list[BatteryInput]) -> np.ndarray:
+    """Stack many inputs into one float64 matrix in FEATURE_COLUMNS order."""
+    with metrics.span("feature_encode_batch"):
+        return encoder.encode_many(items)
+
+
+# Feature names are checked once per loaded model instead of on every call. A
+# model fitted without names gets the bare array; one fitted with names gets a
+# zero-copy DataFrame view so sklearn neither warns nor has to be silenced, and
+# reports a column mismatch itself.
+_validated: tuple = (None, False)  # (model, fitted with feature names)
+
+
+def _wants_frame(model) -> bool:
+    global _validated
+    if _validated[0] is not model:
+        named = getattr(model, "feature_names_in_", None) is not None
+        if not encoder.matches(model):
+            print("Model feature names differ from FEATURE_COLUMNS; predictions will fail validation")
+        _validated = (model, named)
+    return _validated[1]
+
+
+def _predict_matrix(X: np.ndarray, model=None) -> list:
+    if model is None:
+        model = registry.get()
+    if _wants_frame(model):
+        X = pd.DataFrame(X, columns=FEATURE_COLUMNS, copy=False)
+    with metrics.span("model_predict"):
+        return model.predict(X).tolist()
+
+
+def _predict_versioned(X: np.ndarray) -> tuple:
+    """Predict with the current model; returns (predictions, that model's version)."""
+    model, version = registry.current()
+    return _predict_matrix(X, model), version
+
+
+def run_batch_prediction(items: list[BatteryInput]) -> list:
+    """Score many inputs with a single model.predict call."""
+    if not registry.get():
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not items:
+        return []
     try:
-        df = data_to_dataframe(data)
-        return model.predict(df).tolist()
+        return _predict_matrix(inputs_to_matrix(items))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into batched model calls.
+
+    Callers await predict(); a background task drains the queue, waiting at
+    most max_wait_ms after the first row (or until max_size rows) before
+    running one model.predict in a worker thread and resolving every caller
+    with (prediction, version of the model that produced it).
+    """
+
+    def __init__(self, max_size: int, max_wait_ms: float):
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._loop = None
+        self._task = None
+        self.batch_size = metrics.histogram(
+            "predict_microbatch_size", "Rows per batched model.predict call", metrics.SIZE_BUCKETS
+        )
+        self.queue_depth = metrics.histogram(
+            "predict_microbatch_queue_depth", "Rows waiting when a batch is formed", metrics.SIZE_BUCKETS
+        )
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def predict(self, row: np.ndarray) -> tuple:
+        self._ensure_started()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((row, fut))
+        pred, version = await fut
+        return [pred], version
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.queue_depth.observe(len(batch) + queue.qsize())
+            self.batch_size.observe(len(batch))
+            X = np.vstack([row for row, _ in batch])
+            try:
+                preds, version = await cpu_pool.run(_predict_versioned, X)
+            except HTTPException as err:  # pool saturated
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(err)
+                continue
+            except Exception as e:
+                err = HTTPException(status_code=500, detail=str(e))
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(err)
+                continue
+            for (_, fut), pred in zip(batch, preds):
+                if not fut.done():
+                    fut.set_result((pred, version))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.PREDICT_MICROBATCH_ENABLED,
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth_now": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_depth": self.queue_depth.snapshot(),
+        }
+
+
+predict_batcher = MicroBatcher(settings.PREDICT_MICROBATCH_MAX_SIZE, settings.PREDICT_MICROBATCH_MAX_WAIT_MS)
+
+
+async def predict_async(data: BatteryInput) -> list:
+    """Single-row prediction for async handlers; cached and micro-batched when enabled."""
+    if not settings.PREDICT_MICROBATCH_ENABLED:
+        return await cpu_pool.run(run_prediction, data)
+    model, version = registry.current() if registry.ready else await asyncio.to_thread(registry.current)
+    if not model:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    with metrics.span("feature_encode"):
+        row = encoder.encode(data)
+    # Redis lookups are network calls; keep them off the event loop
+    if prediction_cache.blocking:
+        row, key, cached = await asyncio.to_thread(_cache_lookup, row, version)
+    else:
+        row, key, cached = _cache_lookup(row, version)
+    if cached is not None:
+        return cached
+    result, used = await predict_batcher.predict(row)
+    if key is not None:
+        # A hot swap between lookup and predict: store under the model that answered
+        if used != version:
+            key = prediction_cache.key(row, used)
+        if prediction_cache.blocking:
+            await asyncio.to_thread(prediction_cache.set, key, result)
+        else:
+            prediction_cache.set(key, result)
+    return result
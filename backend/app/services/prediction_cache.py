@@ -0,0 +1,154 @@
+"""
+PredictionCache — bounded LRU/TTL cache in front of the battery model.
+
+Keys are a hash of the encoded feature row (optionally rounded) plus the
+loaded model's version, so a hot-swapped model invalidates every entry.
+Entries live in-process by default, or in Redis when configured.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.model_loader import registry
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value) -> int:
+        """Store value; returns how many entries were evicted."""
+        evicted = 0
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int | None:
+        return len(self._data)
+
+
+class RedisBackend:
+    blocking = True
+
+    def __init__(self, url: str, ttl: float, prefix: str = "greenmiles:pred:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.1, socket_connect_timeout=0.1)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value) -> int:
+        self._redis.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+        return 0  # Redis evicts on its own policy
+
+    def clear(self):
+        pass  # keys carry the model version; stale ones expire via TTL
+
+    def size(self) -> int | None:
+        return None  # not tracked for a shared Redis keyspace
+
+
+class PredictionCache:
+    def __init__(self, backend, decimals: int | None = None):
+        self.backend = backend
+        self.decimals = decimals
+        self._version = None
+        self.hits = metrics.counter("prediction_cache_hits", "Prediction cache hits")
+        self.misses = metrics.counter("prediction_cache_misses", "Prediction cache misses")
+        self.evictions = metrics.counter("prediction_cache_evictions", "Prediction cache LRU evictions")
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend.blocking
+
+    def normalize(self, row: np.ndarray) -> np.ndarray:
+        """Quantize continuous inputs so near-identical payloads share an entry."""
+        if self.decimals is None:
+            return row
+        return np.round(row, self.decimals)
+
+    def key(self, row: np.ndarray, version: str | None = None) -> str:
+        """Key for row under the given model version (default: the registry's current one)."""
+        if version is None:
+            version = registry.version
+        if version != self._version:
+            self._version = version
+            self.backend.clear()
+        digest = hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float64).tobytes(), digest_size=16)
+        return f"{version}:{digest.hexdigest()}"
+
+    def get(self, key: str):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:  # a cache outage must never fail a prediction
+            print(f"Prediction cache get error: {e}")
+            value = None
+        (self.hits if value is not None else self.misses).inc()
+        return value
+
+    def set(self, key: str, value):
+        try:
+            evicted = self.backend.set(key, value)
+        except Exception as e:
+            print(f"Prediction cache set error: {e}")
+            return
+        if evicted:
+            self.evictions.inc(evicted)
+
+    def stats(self) -> dict:
+        hits, misses = self.hits.value, self.misses.value
+        return {
+            "enabled": settings.PREDICTION_CACHE_ENABLED,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": hits,
+            "misses": misses,
+            "evictions": self.evictions.value,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+def _make_backend():
+    if settings.PREDICTION_CACHE_BACKEND == "redis":
+        try:
+            return RedisBackend(settings.PREDICTION_CACHE_REDIS_URL, settings.PREDICTION_CACHE_TTL_S)
+        except ImportError:
+            print("redis package not installed; using in-process prediction cache")
+    return MemoryBackend(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_TTL_S)
+
+
+prediction_cache = PredictionCache(_make_backend(), settings.PREDICTION_CACHE_DECIMALS)
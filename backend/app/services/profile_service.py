@@ -1,6 +1,44 @@
-from app.core.database import get_ev_profile, save_ev_profile
+from app.core.config import settings
+from app.core.database import (
+    bulk_save_ev_profiles, get_ev_profile, iter_ev_profiles, save_ev_profile, update_ev_profile,
+)
+from app.core.executors import cpu_pool
+from app.models.schema import BatteryInput
+from app.services.model_service import run_batch_prediction
 from fastapi import HTTPException
 
+# Model inputs a profile doesn't carry; same defaults as the route form
+FLEET_DEFAULTS = dict(
+    Internal_Resistance_Ohm=0.05, Total_Charging_Cycles=100, Battery_Capacity_kWh=75.0,
+    Fast_Charge_Ratio=0.2, Avg_Temperature_C=25.0, Vehicle_Age_Months=12, Avg_Discharge_Rate_C=1.0,
+    Battery_Type_NMC=1, Driving_Style_Moderate=1,
+    Vehicle_Weight_kg=1800.0, Drag_Coefficient=0.23, Frontal_Area_m2=2.2,
+    Rolling_Resistance_Coeff=0.015, Motor_Efficiency=0.9,
+    Trip_Distance_km=100.0, Elevation_Gain_m=100.0, Traffic_Index=5.0, Avg_Speed_kmph=60.0,
+    Humidity_Percent=50.0, Wind_Speed_mps=5.0,
+)
+CAR_MODELS = {
+    "tesla": "Car_Model_Tesla_Model_3",
+    "ford": "Car_Model_Ford_Mustang_Mach_E",
+    "ioniq": "Car_Model_Hyundai_Ioniq_5",
+    "wuling": "Car_Model_Wuling_Air_EV",
+}
+
+
+def profile_to_input(profile: dict, **trip) -> BatteryInput:
+    """Model input for a stored profile, mapped the way the route form does it."""
+    fields = {**FLEET_DEFAULTS, **trip}
+    fields["Battery_Capacity_kWh"] = profile.get("battery_capacity") or fields["Battery_Capacity_kWh"]
+    fields["SoH_Percent"] = profile.get("battery_health")
+    if profile.get("ambient_temperature") is not None:
+        fields["Avg_Temperature_C"] = profile["ambient_temperature"]
+    fields["Vehicle_Weight_kg"] += profile.get("vehicle_load") or 0.0
+    model = str(profile.get("ev_model") or "").lower()
+    for needle, field in CAR_MODELS.items():
+        fields[field] = int(needle in model)
+    return BatteryInput(**fields)
+
+
 class ProfileService:
     async def get(self, user_id: str):
         profile = await get_ev_profile(user_id)
@@ -15,14 +53,34 @@ class ProfileService:
         return {"message": "Profile created", "success": True}
 
     async def update(self, user_id: str, profile_data: dict):
-        existing = await get_ev_profile(user_id)
-        if not existing:
+        changes = {k: v for k, v in profile_data.items() if v is not None}
+        changes.pop("user_id", None)
+
+        updated = await update_ev_profile(user_id, changes)
+        if not updated:
             raise HTTPException(status_code=404, detail="Profile not found")
-        
-        updated = existing.copy()
-        updated.update({k: v for k, v in profile_data.items() if v is not None})
-        
-        result = await save_ev_profile(user_id, updated)
-        if not result.get("success"):
-            raise HTTPException(status_code=500, detail="Failed to update profile")
-        return {"message": "Profile updated", "success": True}
\ No newline at end of file
+        return {"message": "Profile updated", "success": True}
+
+    async def bulk_upsert(self, rows: list[tuple[int, dict]]) -> dict:
+        """Write one chunk of (line number, profile) rows; a later line for the
+        same user_id wins, and the earlier ones come back in `duplicates`.
+        """
+        lines = [line for line, _ in rows]
+        result = await bulk_save_ev_profiles([p for _, p in rows])
+        result["errors"] = [{"line": lines[e["index"]], "error": e["error"]} for e in result["errors"]]
+        result["duplicates"] = [
+            {"line": lines[d["index"]], "error": f"duplicate user_id, superseded by line {lines[d['superseded_by']]}"}
+            for d in result["duplicates"]
+        ]
+        return result
+
+    async def export(self):
+        """Every stored profile, in cursor batches."""
+        async for batch in iter_ev_profiles(settings.PROFILE_BULK_CHUNK_SIZE):
+            yield batch
+
+    async def score_fleet(self, **trip):
+        """Yield (profiles, predictions) per cursor batch, one model call per batch."""
+        async for batch in iter_ev_profiles(settings.PROFILE_SCORE_BATCH_SIZE):
+            items = [profile_to_input(p, **trip) for p in batch]
+            yield batch, await cpu_pool.run(run_batch_prediction, items)
@@ -0,0 +1,129 @@
+"""
+RouteService — geocodes the trip ends, fetches Mapbox alternatives and ranks
+them by the segment-level physics simulation's energy use.
+
+The battery model's outputs are attached to each route as a secondary score
+but not used for ranking: they are battery-health targets that barely respond
+to distance, speed or elevation, so ranking on them reduced to ranking by
+distance.
+"""
+import asyncio
+
+from app.core.executors import cpu_pool
+from app.models.schema import RouteRequest
+from app.services.model_service import run_batch_prediction
+from app.utils.elevation import route_profile
+from app.utils.energy import simulate_route, soc_curve
+from app.utils.geo import parse_coords, estimate_elevation_gain
+from app.utils.model_loader import registry
+
+class RouteService:
+    def __init__(self, mapbox_service):
+        # Anything with async geocode() / get_directions() works, e.g. a local stand-in.
+        self.mapbox = mapbox_service
+
+    async def _resolve(self, location: str) -> str | None:
+        """'lat,lon' or a place name -> Mapbox 'lon,lat' string."""
+        try:
+            return parse_coords(location)
+        except ValueError:
+            return await self.mapbox.geocode(location)
+
+    async def optimize(self, data: RouteRequest) -> dict | None:
+        start, end = await asyncio.gather(
+            self._resolve(data.start_location), self._resolve(data.end_location)
+        )
+        if not start or not end:
+            return None
+
+        directions = await self.mapbox.get_directions(start, end)
+        routes = directions.get("routes") or []
+        if not routes:
+            return None
+
+        candidates = await cpu_pool.run(self._candidates, data, routes)
+
+        # One batched model call for every alternative, reported alongside the physics estimate
+        if await asyncio.to_thread(registry.get) is not None:
+            predictions = await cpu_pool.run(run_batch_prediction, [c["input"] for c in candidates])
+        else:
+            predictions = [None] * len(candidates)
+        for c, prediction in zip(candidates, predictions):
+            c["prediction"] = prediction
+            c["energy_kwh"] = c["physics"]["energy_kwh"]
+
+        candidates.sort(key=lambda c: (c["energy_kwh"], c["distance_km"]))
+        return {
+            "start": start,
+            "end": end,
+            "routes": [self._route_summary(data, c, candidates[0], i == 0) for i, c in enumerate(candidates)],
+        }
+
+    @staticmethod
+    def _candidates(data: RouteRequest, routes: list[dict]) -> list[dict]:
+        candidates = []
+        for route in routes:
+            distance_km = route.get("distance", 0) / 1000.0
+            duration_min = route.get("duration", 0) / 60.0
+            avg_speed = distance_km / (duration_min / 60.0) if duration_min > 0 else data.Avg_Speed_kmph
+            geometry = route.get("geometry") or {}
+            profile = route_profile(geometry)
+            if profile is not None:
+                elevation_gain, elevation_loss = profile["gain_m"], profile["loss_m"]
+            else:
+                elevation_gain, elevation_loss = estimate_elevation_gain(geometry), None
+            trip = data.model_copy(update={
+                "Trip_Distance_km": distance_km,
+                "Avg_Speed_kmph": avg_speed,
+                "Elevation_Gain_m": elevation_gain,
+            })
+            candidates.append({
+                "route": route,
+                "distance_km": distance_km,
+                "duration_min": duration_min,
+                "elevation_gain_m": elevation_gain,
+                "elevation_loss_m": elevation_loss,
+                "profile": profile,
+                "input": trip,
+                "physics": simulate_route(trip, route),
+            })
+        return candidates
+
+    def _route_summary(self, data: RouteRequest, c: dict, best: dict, is_optimal: bool) -> dict:
+        usable_kwh = data.Battery_Capacity_kWh * ((data.SoH_Percent or 100.0) / 100.0)
+        energy = c["energy_kwh"]
+        usage_pct = 100.0 * energy / data.Battery_Capacity_kWh if data.Battery_Capacity_kWh else 0.0
+        relative = best["energy_kwh"] / energy if energy > 0 else 1.0
+        headroom = max(0.0, 1.0 - energy / usable_kwh) if usable_kwh > 0 else 0.0
+
+        if is_optimal:
+            explanation = (
+                f"Lowest simulated energy use: {energy:.1f} kWh over {c['distance_km']:.1f} km "
+                f"with {c['elevation_gain_m']:.0f} m of climbing."
+            )
+        else:
+            explanation = (
+                f"Uses {energy - best['energy_kwh']:.1f} kWh more than the optimal route "
+                f"({c['distance_km']:.1f} km, {c['duration_min']:.0f} min)."
+            )
+
+        return {
+            "distance_km": round(c["distance_km"], 2),
+            "duration_min": round(c["duration_min"], 1),
+            "energy_consumed_kWh": round(energy, 2),
+            "battery_percentage_usage": round(usage_pct, 1),
+            "elevation_gain_m": round(c["elevation_gain_m"], 1),
+            "elevation_loss_m": round(c["elevation_loss_m"], 1) if c["elevation_loss_m"] is not None else None,
+            "traffic_level": round(data.Traffic_Index, 1),
+            "green_score": round(100 * (0.5 * relative + 0.5 * headroom)),
+            "feasible": energy <= usable_kwh,
+            "is_optimal": is_optimal,
+            "route_explanation": explanation,
+            "energy_source": "physics",
+            "physics_energy_kWh": round(c["physics"]["energy_kwh"], 2),
+            "regen_kWh": round(c["physics"]["regen_kwh"], 2),
+            "depleted_at_km": c["physics"]["depleted_at_km"],
+            "soc_curve": soc_curve(c["physics"]),
+            "prediction": c["prediction"],
+            "geometry": c["route"].get("geometry"),
+        }
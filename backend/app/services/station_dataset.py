@@ -0,0 +1,214 @@
+"""
+Columnar station dataset — a typed, memory-mappable build of the stations CSV.
+
+The zipped CSV stays the source of truth. `python -m app.services.station_dataset`
+parses it once into a directory of .npy columns plus meta.json:
+categoricals are dictionary-encoded, connector lists become bitmasks and
+opening hours become minute ranges. Readers open every column with
+mmap_mode="r", so worker processes share the same page-cache pages instead of
+each holding a parsed copy.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from app.utils.geo import lonlat_to_mercator
+
+FORMAT_VERSION = 1
+STATIONS_ZIP_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "ML_Models", "EV-charging-station.zip")
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "ML_Models", "EV-charging-station.cols")
+MINUTES_PER_DAY = 24 * 60
+
+
+def read_stations_csv(zip_path: str) -> pd.DataFrame:
+    with zipfile.ZipFile(zip_path, "r") as z:
+        csv_names = [n for n in z.namelist() if n.endswith(".csv")]
+        if not csv_names:
+            raise ValueError("No CSV file found inside the zip archive")
+        with z.open(csv_names[0]) as f:
+            df = pd.read_csv(f)
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series([""] * len(df), index=df.index)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+def _numeric(df: pd.DataFrame, col: str, dtype) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=dtype)
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=dtype)
+
+
+def _categorical(values: pd.Series) -> tuple[np.ndarray, list[str]]:
+    codes, categories = pd.factorize(values, sort=True)
+    dtype = np.int8 if len(categories) < 128 else np.int16
+    return codes.astype(dtype), [str(c) for c in categories]
+
+
+def _to_minutes(hhmm: str) -> int:
+    h, _, m = hhmm.strip().partition(":")
+    return int(h) * 60 + int(m or 0)
+
+
+def parse_hours(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """'24/7' / 'H:MM-H:MM' -> (open_min, close_min) int16 minutes after midnight.
+    24/7 is (0, 1440); close < open means the range wraps past midnight;
+    unparseable entries are (-1, -1).
+    """
+    parsed = {}
+    for text in values.unique():
+        if text.lower() in ("24/7", "24h", "24 hours"):
+            parsed[text] = (0, MINUTES_PER_DAY)
+            continue
+        try:
+            start, end = text.split("-")
+            parsed[text] = (_to_minutes(start), _to_minutes(end))
+        except ValueError:
+            parsed[text] = (-1, -1)
+    pairs = values.map(parsed)
+    return (
+        np.fromiter((p[0] for p in pairs), dtype=np.int16, count=len(pairs)),
+        np.fromiter((p[1] for p in pairs), dtype=np.int16, count=len(pairs)),
+    )
+
+
+def encode_connectors(values: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """Comma-separated connector lists -> one bitmask per station (bit i = names[i])."""
+    sets = values.map(lambda s: frozenset(p.strip() for p in s.split(",") if p.strip()))
+    names = sorted(set().union(*sets)) if len(sets) else []
+    dtype = next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64) if np.iinfo(t).bits >= len(names))
+    bit = {name: 1 << i for i, name in enumerate(names)}
+    masks = {s: sum(bit[n] for n in s) for s in sets.unique()}
+    return np.fromiter((masks[s] for s in sets), dtype=dtype, count=len(sets)), names
+
+
+def encode_stations(df: pd.DataFrame) -> tuple[dict[str, np.ndarray], dict[str, list[str]]]:
+    """Raw stations DataFrame -> (typed columns, dictionaries for the encoded ones)."""
+    lat = pd.to_numeric(df.get("Latitude", df.get("latitude")), errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df.get("Longitude", df.get("longitude")), errors="coerce").to_numpy(dtype=np.float64)
+    # Drop unparseable rows and the (0, 0) placeholder
+    valid = ~(np.isnan(lat) | np.isnan(lon)) & ~((lat == 0) & (lon == 0))
+    df = df.loc[valid]
+    lat, lon = lat[valid], lon[valid]
+
+    charger_type, charger_types = _categorical(_text(df, "Charger Type"))
+    operator, operators = _categorical(_text(df, "Station Operator"))
+    connectors, connector_types = encode_connectors(_text(df, "Connector Types"))
+    open_min, close_min = parse_hours(_text(df, "Availability"))
+    merc_x, merc_y = lonlat_to_mercator(lon, lat)
+    x_order = np.argsort(merc_x, kind="stable")
+
+    columns = {
+        "ids": df["Station ID"].astype(str).to_numpy(dtype=np.str_),
+        "lat": lat,
+        "lon": lon,
+        "lat_rad": np.radians(lat),
+        "lon_rad": np.radians(lon),
+        "cost": _numeric(df, "Cost (USD/kWh)", np.float32),
+        "rating": _numeric(df, "Reviews (Rating)", np.float32),
+        "capacity_kw": _numeric(df, "Charging Capacity (kW)", np.float32),
+        "charger_type": charger_type,
+        "operator": operator,
+        "connectors": connectors,
+        "open_min": open_min,
+        "close_min": close_min,
+        "renewable": _text(df, "Renewable Energy Source").str.lower().isin(["yes", "true", "1"]).to_numpy(),
+        "merc_x": merc_x,
+        "merc_y": merc_y,
+        "x_order": x_order,
+        "x_sorted": merc_x[x_order],
+    }
+    dictionaries = {"charger_type": charger_types, "operator": operators, "connectors": connector_types}
+    return columns, dictionaries
+
+
+def build_dataset(zip_path: str = STATIONS_ZIP_PATH, out_dir: str = DATASET_PATH) -> dict:
+    """Convert the zip into the columnar directory and return its metadata.
+    The directory is written next to its final location and renamed into
+    place, so concurrent readers never see a half-written dataset.
+    """
+    zip_path, out_dir = os.path.abspath(zip_path), os.path.abspath(out_dir)
+    st = os.stat(zip_path)
+    columns, dictionaries = encode_stations(read_stations_csv(zip_path))
+    meta = {
+        "format": FORMAT_VERSION,
+        "source": os.path.basename(zip_path),
+        "source_mtime_ns": st.st_mtime_ns,
+        "source_size": st.st_size,
+        "rows": len(columns["ids"]),
+        "built_at": time.time(),
+        "columns": {name: str(arr.dtype) for name, arr in columns.items()},
+        "dictionaries": dictionaries,
+    }
+
+    parent = os.path.dirname(out_dir)
+    tmp = tempfile.mkdtemp(prefix=".stations-", dir=parent)
+    try:
+        os.chmod(tmp, 0o755)  # mkdtemp is owner-only; workers may run as another user
+        for name, arr in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        old = None
+        if os.path.exists(out_dir):
+            old = tempfile.mkdtemp(prefix=".stations-old-", dir=parent)
+            os.replace(out_dir, os.path.join(old, "data"))
+        os.replace(tmp, out_dir)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return meta
+
+
+def open_dataset(out_dir: str = DATASET_PATH, source_mtime_ns: int | None = None):
+    """Memory-map a built dataset -> (columns, meta), or None if it is missing,
+    from another format version, or older than the source zip.
+    """
+    meta_path = os.path.join(out_dir, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != FORMAT_VERSION:
+        return None
+    if source_mtime_ns is not None and meta.get("source_mtime_ns") != source_mtime_ns:
+        return None
+    try:
+        columns = {
+            name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in meta["columns"]
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    return columns, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar station dataset from the zipped CSV.")
+    parser.add_argument("--zip", default=STATIONS_ZIP_PATH, help="source EV-charging-station.zip")
+    parser.add_argument("--out", default=DATASET_PATH, help="output directory")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    meta = build_dataset(args.zip, args.out)
+    size = sum(os.path.getsize(os.path.join(args.out, n)) for n in os.listdir(args.out))
+    print(f"Built {os.path.abspath(args.out)}: {meta['rows']} rows, {len(meta['columns'])} columns, "
+          f"{size / 1024:.0f} KiB in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+StationStore — in-memory, columnar snapshot of the charging-station dataset.
+Columns come memory-mapped from the built columnar dataset (see
+station_dataset), which is rebuilt from the zip when it is missing or stale;
+if it cannot be used the zip is parsed into memory instead. A new snapshot is
+swapped in atomically whenever the zip's mtime changes.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from app.core import metrics
+from app.services.station_dataset import (
+    DATASET_PATH, STATIONS_ZIP_PATH, build_dataset, encode_stations, open_dataset, read_stations_csv,
+)
+from app.utils.geo import EARTH_RADIUS_KM
+
+
+@dataclass(frozen=True)
+class StationSnapshot:
+    """Immutable columnar view of every valid station in the dataset."""
+    version: int                    # source mtime_ns, bumps on every reload
+    ids: np.ndarray                 # <U fixed-width station ids
+    lat: np.ndarray                 # degrees, float64
+    lon: np.ndarray                 # degrees, float64
+    lat_rad: np.ndarray             # radians, float64
+    lon_rad: np.ndarray             # radians, float64
+    cost: np.ndarray                # USD/kWh, float32
+    rating: np.ndarray              # float32
+    capacity_kw: np.ndarray         # float32
+    charger_type: np.ndarray        # int8 codes into charger_types
+    charger_types: tuple = ()
+    operator: np.ndarray | None = None      # int8 codes into operators
+    operators: tuple = ()
+    connectors: np.ndarray | None = None    # bitmask, bit i = connector_types[i]
+    connector_types: tuple = ()
+    open_min: np.ndarray | None = None      # int16 minutes after midnight, -1 unknown
+    close_min: np.ndarray | None = None     # 1440 for 24/7; < open_min wraps midnight
+    renewable: np.ndarray | None = None     # bool
+    tree: BallTree | None = None    # haversine BallTree over (lat_rad, lon_rad)
+    merc_x: np.ndarray | None = None    # normalised Web Mercator, float64
+    merc_y: np.ndarray | None = None
+    x_order: np.ndarray | None = None   # argsort of merc_x, for box queries
+    x_sorted: np.ndarray | None = None  # merc_x[x_order]
+    source: str = "csv"                 # "columnar" when memory-mapped from the built dataset
+    load_time_ms: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> tuple[np.ndarray, np.ndarray]:
+        """Indices and distances (km) of stations within radius_km, nearest first."""
+        if self.tree is None or radius_km <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        idx, dist = self.tree.query_radius(
+            np.radians([[lat, lon]]), r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True, sort_results=True,
+        )
+        return idx[0], dist[0] * EARTH_RADIUS_KM
+
+    def in_box(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """Indices of stations with x0 <= merc_x < x1 and y0 <= merc_y < y1.
+        x0 > x1 means the box wraps across the antimeridian.
+        """
+        lo, hi = np.searchsorted(self.x_sorted, [x0, x1], side="left")
+        if x0 <= x1:
+            cand = self.x_order[lo:hi]
+        else:
+            cand = np.concatenate([self.x_order[lo:], self.x_order[:hi]])
+        y = self.merc_y[cand]
+        return cand[(y >= y0) & (y < y1)]
+
+    def nearest(self, lat: float, lon: float) -> tuple[int, float]:
+        """Index and distance (km) of the single closest station."""
+        dist, idx = self.tree.query(np.radians([[lat, lon]]), k=1)
+        return int(idx[0, 0]), float(dist[0, 0]) * EARTH_RADIUS_KM
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes for a in (
+                self.ids, self.lat, self.lon, self.lat_rad, self.lon_rad,
+                self.cost, self.rating, self.capacity_kw, self.charger_type,
+                self.operator, self.connectors, self.open_min, self.close_min, self.renewable,
+                self.merc_x, self.merc_y, self.x_order, self.x_sorted,
+            ) if a is not None
+        )
+
+
+def snapshot_from_columns(columns: dict, dictionaries: dict, version: int = 0,
+                          source: str = "csv") -> StationSnapshot:
+    """Wrap typed columns (in memory or memory-mapped) in a StationSnapshot."""
+    return StationSnapshot(
+        version=version,
+        charger_types=tuple(dictionaries["charger_type"]),
+        operators=tuple(dictionaries["operator"]),
+        connector_types=tuple(dictionaries["connectors"]),
+        tree=BallTree(np.column_stack([columns["lat_rad"], columns["lon_rad"]]), metric="haversine")
+        if len(columns["lat"]) else None,
+        source=source,
+        **columns,
+    )
+
+
+def build_snapshot(df: pd.DataFrame, version: int = 0) -> StationSnapshot:
+    """Convert the raw stations DataFrame into a StationSnapshot."""
+    return snapshot_from_columns(*encode_stations(df), version=version)
+
+
+class StationStore:
+    """Holds the current StationSnapshot and reloads it when the zip changes."""
+
+    def __init__(self, zip_path: str = STATIONS_ZIP_PATH, dataset_path: str | None = DATASET_PATH,
+                 check_interval: float = 1.0, autobuild: bool = True):
+        self.zip_path = os.path.abspath(zip_path)
+        self.dataset_path = os.path.abspath(dataset_path) if dataset_path else None
+        self.autobuild = autobuild
+        self.check_interval = check_interval
+        self._snapshot: StationSnapshot | None = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _mtime(self) -> int:
+        if not os.path.exists(self.zip_path):
+            raise FileNotFoundError(f"Stations zip not found at: {self.zip_path}")
+        return os.stat(self.zip_path).st_mtime_ns
+
+    def load(self) -> StationSnapshot:
+        """(Re)build the snapshot from disk and swap it in."""
+        with self._lock:
+            return self._load_locked(self._mtime())
+
+    def _load_locked(self, mtime: int) -> StationSnapshot:
+        if self._snapshot is not None and self._snapshot.version == mtime:
+            return self._snapshot
+        t0 = time.perf_counter()
+        with metrics.span("station_load"):
+            opened = self._open_dataset(mtime)
+            if opened is not None:
+                columns, meta = opened
+                snap = snapshot_from_columns(columns, meta["dictionaries"], version=mtime, source="columnar")
+            else:
+                snap = build_snapshot(read_stations_csv(self.zip_path), version=mtime)
+        snap = replace(snap, load_time_ms=(time.perf_counter() - t0) * 1000)
+        # Single reference assignment: readers see either the old or the new snapshot
+        self._snapshot = snap
+        self._last_check = time.monotonic()
+        print(f"Stations loaded ({snap.source}): {len(snap)} rows, {snap.nbytes / 1024:.0f} KiB "
+              f"in {snap.load_time_ms:.1f} ms")
+        return snap
+
+    def _open_dataset(self, mtime: int):
+        """Memory-map the columnar dataset for this zip version, building it first if needed."""
+        if self.dataset_path is None:
+            return None
+        opened = open_dataset(self.dataset_path, mtime)
+        if opened is None and self.autobuild:
+            try:
+                build_dataset(self.zip_path, self.dataset_path)
+            except OSError as e:  # e.g. read-only deployment; fall back to parsing the zip
+                print(f"Station dataset build failed: {e}")
+                return None
+            opened = open_dataset(self.dataset_path, mtime)
+        return opened
+
+    def get(self) -> StationSnapshot:
+        """Return the current snapshot, reloading if the zip's mtime changed."""
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is not None and now - self._last_check < self.check_interval:
+            return snap
+        with self._lock:
+            self._last_check = now
+            try:
+                return self._load_locked(self._mtime())
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                print(f"Stations reload failed, keeping previous snapshot: {e}")
+                return self._snapshot
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        if snap is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "version": snap.version,
+            "stations": len(snap),
+            "source": snap.source,
+            "size_bytes": snap.nbytes,
+            "load_time_ms": round(snap.load_time_ms, 2),
+            "loaded_at": snap.loaded_at,
+        }
+
+
+station_store = StationStore()
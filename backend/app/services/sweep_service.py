@@ -0,0 +1,166 @@
+"""
+Sweep — what-if grids over BatteryInput fields, evaluated in bounded chunks.
+
+A sweep is a base vehicle plus a list of values for some numeric fields; the
+points are the Cartesian product of those lists, in C order (the last field
+varies fastest). Point i is never materialised as a BatteryInput: its grid
+coordinates come from np.unravel_index and are written straight into a copy of
+the encoded base row. Only SWEEP_CHUNK_SIZE rows exist at a time, so memory
+stays flat however large the grid is, and each chunk is predicted and encoded
+(JSON, CSV or Arrow IPC) on the CPU pool before being streamed out. The model
+is fixed when the sweep is created, so a hot reload never mixes versions
+within one response.
+"""
+import io
+import math
+import typing
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.models.schema import BatteryInput, SweepRange, SweepRequest
+from app.services.model_service import FEATURE_FIELDS, _predict_matrix, encoder
+from app.utils.http_cache import dumps
+
+FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _is_int_field(name: str) -> bool:
+    return BatteryInput.model_fields[name].annotation in (int, typing.Optional[int])
+
+
+class Sweep:
+    def __init__(self, request: SweepRequest, max_points: int, chunk_size: int, model):
+        if model is None:
+            raise HTTPException(status_code=503, detail="Model not loaded")
+        if not request.grid:
+            raise HTTPException(status_code=400, detail="grid must name at least one field")
+        # Size the grid from the request alone, before any axis is allocated
+        total = math.prod(a.steps if isinstance(a, SweepRange) else len(a) for a in request.grid.values())
+        if total > max_points:
+            raise HTTPException(status_code=413, detail=f"Sweep has {total} points (max {max_points})")
+        self.names = list(request.grid)
+        self.columns = []
+        self.values = []
+        for name in self.names:
+            if name not in FEATURE_FIELDS:
+                raise HTTPException(status_code=400, detail=f"{name} is not a numeric BatteryInput field")
+            axis = request.grid[name]
+            if isinstance(axis, SweepRange):
+                values = np.linspace(axis.start, axis.stop, axis.steps)
+            else:
+                values = np.asarray(axis, dtype=np.float64)
+            if values.size == 0 or not np.isfinite(values).all():
+                raise HTTPException(status_code=400, detail=f"{name} needs at least one finite value")
+            if _is_int_field(name):
+                values = np.rint(values)  # integer fields take whole values, in the caller's order
+                if isinstance(axis, SweepRange):
+                    # A range finer than 1 rounds to repeats; keep each whole value once
+                    values = values[np.sort(np.unique(values, return_index=True)[1])]
+            self.columns.append(FEATURE_FIELDS.index(name))
+            self.values.append(values)
+
+        self.shape = tuple(len(v) for v in self.values)
+        self.total = math.prod(self.shape)  # <= the checked size; rounding may merge range values
+        self.chunk_size = max(1, chunk_size)
+        self.base = encoder.encode(request.base)
+        self.model = model
+        self.outputs: int | None = None
+
+    def chunks(self) -> range:
+        return range(0, self.total, self.chunk_size)
+
+    def matrix(self, start: int) -> tuple[np.ndarray, np.ndarray]:
+        """Model rows for points [start, start + chunk_size), plus their grid coordinates."""
+        stop = min(start + self.chunk_size, self.total)
+        idx = np.unravel_index(np.arange(start, stop), self.shape)
+        X = np.repeat(self.base[np.newaxis, :], stop - start, axis=0)
+        coords = np.empty((stop - start, len(self.names)))
+        for j, (col, values, i) in enumerate(zip(self.columns, self.values, idx)):
+            X[:, col] = coords[:, j] = values[i]
+        return X, coords
+
+    def predict(self, start: int) -> tuple[np.ndarray, np.ndarray]:
+        X, coords = self.matrix(start)
+        pred = np.asarray(_predict_matrix(X, self.model), dtype=np.float64)
+        if pred.ndim == 1:
+            pred = pred[:, np.newaxis]
+        if self.outputs is None:
+            self.outputs = pred.shape[1]
+        return coords, pred
+
+    def header(self) -> dict:
+        return {
+            "fields": self.names,
+            "axes": {name: v.tolist() for name, v in zip(self.names, self.values)},
+            "shape": list(self.shape),
+            "count": self.total,
+        }
+
+    # -- encoders: each returns the bytes for one chunk -------------------
+
+    def json_chunk(self, start: int) -> bytes:
+        """JSON document pieces; predictions are rows in grid (C) order."""
+        _, pred = self.predict(start)
+        body = dumps(pred.tolist())[1:-1]  # [[..],[..]] -> [..],[..]
+        if start == 0:
+            head = dumps(self.header())[:-1] + b',"outputs":' + str(self.outputs).encode()
+            body = head + b',"predictions":[' + body
+        else:
+            body = b"," + body
+        if start + self.chunk_size >= self.total:
+            body += b"]}"
+        return body
+
+    def csv_chunk(self, start: int) -> bytes:
+        coords, pred = self.predict(start)
+        out = io.StringIO()
+        if start == 0:
+            out.write(",".join(self.names + [f"output_{k}" for k in range(self.outputs)]) + "\n")
+        np.savetxt(out, np.hstack([coords, pred]), fmt="%.10g", delimiter=",")
+        return out.getvalue().encode()
+
+    def arrow_writer(self):
+        """Stateful encoder for an Arrow IPC stream: schema with the first batch."""
+        import pyarrow as pa  # optional dependency, only needed for format=arrow
+
+        sink = io.BytesIO()
+        writer = None
+
+        def encode(start: int) -> bytes:
+            nonlocal writer
+            coords, pred = self.predict(start)
+            arrays = [pa.array(coords[:, j]) for j in range(len(self.names))]
+            arrays += [pa.array(pred[:, k]) for k in range(self.outputs)]
+            batch = pa.RecordBatch.from_arrays(arrays, names=self.names + [f"output_{k}" for k in range(self.outputs)])
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, batch.schema)
+            writer.write_batch(batch)
+            if start + self.chunk_size >= self.total:
+                writer.close()
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        return encode
+
+
+def check_format(fmt: str):
+    if fmt == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="format=arrow needs the pyarrow package on the server")
+
+
+def encoder_for(sweep: Sweep, fmt: str):
+    if fmt == "csv":
+        return sweep.csv_chunk
+    if fmt == "arrow":
+        return sweep.arrow_writer()
+    return sweep.json_chunk
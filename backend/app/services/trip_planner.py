@@ -0,0 +1,251 @@
+"""
+TripPlanner — charging stops for trips longer than one charge.
+
+Stations are the nodes of an implicit graph whose edges are the hops the
+vehicle can drive between charges. Neighbours are expanded lazily with a
+BallTree range query, so a search only touches stations near its corridor.
+To bound the branching factor, stations are thinned to one candidate per
+TRIP_PLANNER_CELL_KM grid cell (the fastest charger for time, the cheapest
+for cost); the thinned index is built once per dataset version. Road distance
+is approximated as great-circle distance times ROAD_FACTOR.
+
+Charging policy: at each stop the vehicle charges just enough for the next
+hop plus the arrival reserve, never above charge_to_percent. Every stop after
+the first is therefore reached with exactly the reserve, so its outgoing edge
+costs depend only on the station. Stops reached straight from the start
+arrive with some charge left over, so they get their own copy of the node
+(index + M) and the search stays exact on the thinned graph.
+
+The search is A* on total time (driving + charging) or on charging cost, with
+ties broken by the other objective. The heuristic is the straight-line drive
+plus charging the energy that drive needs at the fastest (or cheapest) rate
+anywhere, which never overestimates.
+"""
+import heapq
+import threading
+import time
+
+import numpy as np
+from fastapi import HTTPException
+from sklearn.neighbors import BallTree
+
+from app.core.config import settings
+from app.services.station_store import StationSnapshot, station_store
+from app.utils.geo import EARTH_RADIUS_KM, haversine_batch
+
+ROAD_FACTOR = 1.25          # road km per great-circle km
+KM_PER_DEG = 111.195
+
+
+def thin_stations(snap: StationSnapshot, score: np.ndarray, cell_km: float) -> np.ndarray:
+    """Indices of the best-scoring (lowest) station in each ~cell_km grid cell."""
+    if cell_km <= 0 or len(snap) == 0:
+        return np.arange(len(snap))
+    step = cell_km / KM_PER_DEG
+    row = np.floor(snap.lat / step)
+    col = np.floor(snap.lon * np.cos(np.radians((row + 0.5) * step)) / step)
+    order = np.lexsort((score, col, row))
+    r, c = row[order], col[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (r[1:] != r[:-1]) | (c[1:] != c[:-1])
+    return np.sort(order[first])
+
+
+class TripPlanner:
+    def __init__(self, store=station_store, cell_km: float | None = None, max_expansions: int | None = None):
+        self.store = store
+        self.cell_km = settings.TRIP_PLANNER_CELL_KM if cell_km is None else cell_km
+        self.max_expansions = max_expansions or settings.TRIP_PLANNER_MAX_EXPANSIONS
+        self._indexes: dict = {}  # optimize -> (dataset version, candidate indices, BallTree)
+        self._lock = threading.Lock()
+
+    def _candidates(self, snap: StationSnapshot, optimize: str) -> tuple[np.ndarray, BallTree]:
+        cached = self._indexes.get(optimize)
+        if cached is not None and cached[0] == snap.version:
+            return cached[1], cached[2]
+        with self._lock:
+            cached = self._indexes.get(optimize)
+            if cached is None or cached[0] != snap.version:
+                score = -snap.capacity_kw if optimize == "time" else snap.cost
+                rep = thin_stations(snap, score, self.cell_km)
+                tree = BallTree(np.column_stack([snap.lat_rad[rep], snap.lon_rad[rep]]), metric="haversine")
+                cached = self._indexes[optimize] = (snap.version, rep, tree)
+        return cached[1], cached[2]
+
+    def plan(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float,
+             battery_percent: float, battery_capacity: float, efficiency: float,
+             optimize: str = "time", avg_speed_kmph: float = 80.0, reserve_percent: float = 10.0,
+             charge_to_percent: float = 80.0, max_charge_kw: float = 150.0) -> dict:
+        """Best sequence of charging stops from start to end, by total time or charging cost."""
+        t0 = time.perf_counter()
+        try:
+            snap = self.store.get()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Stations load error: {e}")
+        if battery_capacity <= 0 or efficiency <= 0 or avg_speed_kmph <= 0:
+            raise HTTPException(status_code=400, detail="Battery capacity, efficiency and speed must be positive.")
+
+        start_kwh = battery_capacity * battery_percent / 100.0
+        reserve_kwh = battery_capacity * reserve_percent / 100.0
+        full_kwh = battery_capacity * charge_to_percent / 100.0
+        by_time = optimize == "time"
+        end_r = (np.radians(end_lat), np.radians(end_lon))
+
+        if len(snap):
+            rep, tree = self._candidates(snap, optimize)
+        else:
+            rep, tree = np.empty(0, dtype=np.intp), None
+        m = len(rep)
+        lat_r, lon_r = snap.lat_rad[rep], snap.lon_rad[rep]
+        power = np.minimum(snap.capacity_kw[rep].astype(np.float64), max_charge_kw)
+        price = snap.cost[rep].astype(np.float64)
+        best_power = float(power.max()) if m else max_charge_kw
+        best_price = float(price.min()) if m else 0.0
+        # Straight-line drive to the goal from every candidate, reused by the heuristic
+        goal_km = haversine_batch(lat_r, lon_r, *end_r) * ROAD_FACTOR
+
+        def heuristic(road_km, arrive_kwh):
+            charge = np.maximum(road_km / efficiency + reserve_kwh - arrive_kwh, 0.0)
+            if by_time:
+                return road_km / avg_speed_kmph + charge / best_power
+            return charge * best_price
+
+        # States: 0..m-1 later stops, m..2m-1 first stops, 2m start, 2m+1 goal
+        START, GOAL = 2 * m, 2 * m + 1
+        best1 = np.full(2 * m + 2, np.inf)
+        best2 = np.full(2 * m + 2, np.inf)
+        prev = np.full(2 * m + 2, -1, dtype=np.int64)
+        hop_km = np.zeros(2 * m + 2)
+        charged = np.zeros(2 * m + 2)
+        best1[START] = best2[START] = 0.0
+        heap = [(0.0, 0.0, 0.0, START)]
+        expanded = 0
+        complete = True
+
+        while heap:
+            _, g1, g2, s = heapq.heappop(heap)
+            if s == GOAL:
+                break
+            if (g1, g2) > (best1[s], best2[s]):
+                continue  # stale heap entry
+            if expanded >= self.max_expansions:
+                complete = False
+                break
+            expanded += 1
+
+            if s == START:
+                node, lat, lon, arrive_kwh = None, np.radians(start_lat), np.radians(start_lon), start_kwh
+                max_depart = start_kwh
+            else:
+                node = s % m
+                lat, lon = lat_r[node], lon_r[node]
+                arrive_kwh = start_kwh - hop_km[s] / efficiency if s >= m else reserve_kwh
+                max_depart = max(full_kwh, arrive_kwh)
+            reach = (max_depart - reserve_kwh) * efficiency / ROAD_FACTOR
+
+            # Every candidate in reach plus the goal, scored in one vectorised pass
+            if tree is not None and reach > 0:
+                idx, dist = tree.query_radius([[lat, lon]], r=reach / EARTH_RADIUS_KM, return_distance=True)
+                idx, dist = idx[0], dist[0] * EARTH_RADIUS_KM
+            else:
+                idx, dist = np.empty(0, dtype=np.intp), np.empty(0)
+            if node is not None:
+                keep = idx != node
+                idx, dist = idx[keep], dist[keep]
+            targets = np.append(idx if node is not None else idx + m, GOAL)
+            road_km = np.append(dist, haversine_batch(lat, lon, *end_r)) * ROAD_FACTOR
+            need_kwh = road_km / efficiency + reserve_kwh
+            if node is None:
+                charge = np.zeros(len(targets))
+                step_time, step_cost = road_km / avg_speed_kmph, charge
+            else:
+                charge = np.maximum(need_kwh - arrive_kwh, 0.0)
+                step_time = road_km / avg_speed_kmph + charge / power[node]
+                step_cost = charge * price[node]
+            p1 = g1 + (step_time if by_time else step_cost)
+            p2 = g2 + (step_cost if by_time else step_time)
+
+            b1, b2 = best1[targets], best2[targets]
+            better = (need_kwh <= max_depart + 1e-9) & ((p1 < b1) | ((p1 == b1) & (p2 < b2)))
+            if not better.any():
+                continue
+            t, p1, p2 = targets[better], p1[better], p2[better]
+            best1[t], best2[t], prev[t] = p1, p2, s
+            hop_km[t], charged[t] = road_km[better], charge[better]
+
+            # Later stops arrive on reserve; first stops keep what the start hop left
+            arrive = np.where(t >= m, start_kwh - hop_km[t] / efficiency, reserve_kwh)
+            h = np.where(t == GOAL, 0.0, heuristic(goal_km[t % m] if m else np.zeros(len(t)), arrive))
+            for f, a, b, ts in zip((p1 + h).tolist(), p1.tolist(), p2.tolist(), t.tolist()):
+                heapq.heappush(heap, (f, a, b, ts))
+
+        if prev[GOAL] < 0:
+            raise HTTPException(status_code=404, detail="No feasible charging plan found.")
+        result = self._itinerary(snap, rep, prev, hop_km, charged, START, GOAL, power, battery_capacity,
+                                 start_kwh, efficiency, avg_speed_kmph)
+        result.update({
+            "optimize": optimize,
+            "complete": complete,
+            "candidates": m,
+            "expanded": expanded,
+            "search_ms": round((time.perf_counter() - t0) * 1000, 2),
+        })
+        return result
+
+    @staticmethod
+    def _itinerary(snap: StationSnapshot, rep: np.ndarray, prev: np.ndarray, hop_km: np.ndarray,
+                   charged: np.ndarray, start: int, goal: int, power: np.ndarray, capacity: float,
+                   start_kwh: float, efficiency: float, speed: float) -> dict:
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(prev[path[-1]]))
+        path.reverse()
+
+        m = len(rep)
+        stops = []
+        level = start_kwh
+        drive_h = charge_h = money = distance = 0.0
+        for a, b in zip(path, path[1:]):
+            if a != start:
+                # charged[b] is taken at stop `a` before driving on to `b`
+                i = a % m
+                kwh = float(charged[b])
+                hours = kwh / float(power[i])
+                cost = kwh * float(snap.cost[rep[i]])
+                level += kwh
+                stops[-1].update({
+                    "charge_kwh": round(kwh, 2),
+                    "charge_min": round(hours * 60, 1),
+                    "charge_cost": round(cost, 2),
+                    "depart_percent": round(100.0 * level / capacity, 1),
+                })
+                charge_h += hours
+                money += cost
+            road_km = float(hop_km[b])
+            level -= road_km / efficiency
+            drive_h += road_km / speed
+            distance += road_km
+            if b != goal:
+                j = int(rep[b % m])
+                stops.append({
+                    "station_id": str(snap.ids[j]),
+                    "latitude": float(snap.lat[j]),
+                    "longitude": float(snap.lon[j]),
+                    "capacity_kw": round(float(snap.capacity_kw[j]), 1),
+                    "cost": round(float(snap.cost[j]), 4),
+                    "distance_from_prev_km": round(road_km, 2),
+                    "arrival_percent": round(100.0 * level / capacity, 1),
+                })
+
+        return {
+            "total_distance_km": round(distance, 2),
+            "total_time_min": round((drive_h + charge_h) * 60, 1),
+            "drive_time_min": round(drive_h * 60, 1),
+            "charge_time_min": round(charge_h * 60, 1),
+            "charging_cost": round(money, 2),
+            "arrival_percent": round(100.0 * level / capacity, 1),
+            "stops": stops,
+        }
+
+
+trip_planner = TripPlanner()
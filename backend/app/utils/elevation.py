@@ -0,0 +1,116 @@
+"""
+Elevation profiles from a local DEM tile set.
+
+Tiles are SRTM-style .hgt files (1x1 degree, big-endian int16, 1201 or 3601
+samples per side, named e.g. N28E077.hgt) in DEM_TILE_DIR. Each tile is
+memory-mapped on first use and kept in an LRU, so lookups touch only the
+pages a route crosses. Missing tiles are not cached, so a tile dropped into
+the directory at runtime is used by the next lookup. Route geometry is resampled at a fixed distance step
+with a vectorised cumulative haversine, then heights are bilinearly
+interpolated per tile in one NumPy pass.
+"""
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.geo import haversine_batch
+
+DEM_DIR = Path(settings.DEM_TILE_DIR) if settings.DEM_TILE_DIR else \
+    Path(__file__).resolve().parent.parent.parent / "ML_Models" / "dem"
+VOID = -32768
+
+
+def tile_name(lat_floor: int, lon_floor: int) -> str:
+    ns = "N" if lat_floor >= 0 else "S"
+    ew = "E" if lon_floor >= 0 else "W"
+    return f"{ns}{abs(lat_floor):02d}{ew}{abs(lon_floor):03d}.hgt"
+
+
+@lru_cache(maxsize=settings.DEM_TILE_CACHE_SIZE)
+def _map_tile(path: Path) -> np.ndarray:
+    side = int(math.isqrt(os.path.getsize(path) // 2))
+    return np.memmap(path, dtype=">i2", mode="r", shape=(side, side))
+
+
+def load_tile(lat_floor: int, lon_floor: int) -> np.ndarray | None:
+    """Memory-mapped height grid for the tile whose SW corner is (lat_floor, lon_floor)."""
+    path = DEM_DIR / tile_name(lat_floor, lon_floor)
+    if not path.exists():
+        return None
+    return _map_tile(path)
+
+
+def heights(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Bilinearly interpolated heights in metres; NaN where no tile or void data."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    out = np.full(lat.shape, np.nan)
+    lat_f = np.floor(lat).astype(np.int64)
+    lon_f = np.floor(lon).astype(np.int64)
+    keys, inverse = np.unique(np.stack([lat_f, lon_f], axis=-1).reshape(-1, 2), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    for k, (la, lo) in enumerate(keys.tolist()):
+        grid = load_tile(la, lo)
+        if grid is None:
+            continue
+        sel = np.flatnonzero(inverse == k)
+        n = grid.shape[0] - 1
+        # Row 0 is the northern edge of the tile
+        r = (la + 1 - lat.flat[sel]) * n
+        c = (lon.flat[sel] - lo) * n
+        r0 = np.clip(np.floor(r).astype(np.int64), 0, n - 1)
+        c0 = np.clip(np.floor(c).astype(np.int64), 0, n - 1)
+        fr, fc = r - r0, c - c0
+        q = [grid[r0, c0], grid[r0, c0 + 1], grid[r0 + 1, c0], grid[r0 + 1, c0 + 1]]
+        q = [np.where(v == VOID, np.nan, v.astype(np.float64)) for v in q]
+        out.flat[sel] = (
+            q[0] * (1 - fr) * (1 - fc) + q[1] * (1 - fr) * fc + q[2] * fr * (1 - fc) + q[3] * fr * fc
+        )
+    return out
+
+
+def resample(coords: np.ndarray, interval_m: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Points every interval_m along a (N, 2) lon/lat polyline -> (distance_m, lon, lat)."""
+    lon_r, lat_r = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    seg_km = haversine_batch(lat_r[:-1], lon_r[:-1], lat_r[1:], lon_r[1:])
+    cum_m = np.concatenate([[0.0], np.cumsum(seg_km) * 1000.0])
+    total = cum_m[-1]
+    if total == 0:
+        return np.zeros(1), coords[:1, 0], coords[:1, 1]
+    dist = np.append(np.arange(0.0, total, interval_m), total)
+    return dist, np.interp(dist, cum_m, coords[:, 0]), np.interp(dist, cum_m, coords[:, 1])
+
+
+def route_profile(geometry: dict, interval_m: float | None = None) -> dict | None:
+    """Elevation profile along a GeoJSON LineString.
+
+    Returns distance_m / elevation_m arrays (one entry per sample), the grade
+    of each segment between samples, total gain and loss in metres and the
+    fraction of samples covered by DEM data, or None if the geometry is empty
+    or no tile covers it.
+    """
+    coords = np.asarray(geometry.get("coordinates") or [], dtype=np.float64)
+    if coords.ndim != 2 or len(coords) < 2:
+        return None
+    dist, lon, lat = resample(coords, interval_m or settings.DEM_SAMPLE_INTERVAL_M)
+    elev = heights(lat, lon)
+    valid = ~np.isnan(elev)
+    if not valid.any():
+        return None
+    # Bridge short voids so they neither add nor hide climbing
+    elev = np.interp(dist, dist[valid], elev[valid])
+    diff = np.diff(elev)
+    seg_m = np.diff(dist)
+    return {
+        "distance_m": dist,
+        "elevation_m": elev,
+        "grade": np.divide(diff, seg_m, out=np.zeros_like(diff), where=seg_m > 0),
+        "gain_m": float(diff[diff > 0].sum()),
+        "loss_m": float(-diff[diff < 0].sum()),
+        "coverage": float(valid.mean()),
+    }
@@ -0,0 +1,146 @@
+"""
+Segment-level EV energy simulation along a Mapbox route.
+
+A route is split into the segments between consecutive geometry points.
+Per-segment length and speed come from Mapbox annotations when present,
+otherwise from the route's steps; grade comes from the DEM (app.utils.elevation).
+Each segment's tractive energy is the sum of rolling, aerodynamic, grade and
+inertial work, divided by drivetrain efficiency when positive and recovered
+through regen when negative, plus auxiliary (HVAC) load over its duration.
+Everything is computed as whole-array NumPy expressions.
+"""
+import numpy as np
+
+from app.models.schema import BatteryInput
+from app.utils.elevation import heights
+from app.utils.geo import haversine_batch
+
+G = 9.81
+PAYLOAD_KG = 80.0              # driver
+REGEN_EFFICIENCY = 0.65        # share of braking energy that reaches the battery (before motor losses)
+AUX_BASE_KW = 0.3
+HVAC_KW_PER_C = 0.08           # per degree away from HVAC_COMFORT_C
+HVAC_COMFORT_C = 21.0
+HVAC_MAX_KW = 3.0
+J_PER_KWH = 3.6e6
+
+
+def route_segments(route: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(distance_m, speed_mps, elevation_m) per segment of a Mapbox route.
+
+    Elevation is the DEM height at each segment's end point (one more entry
+    than segments, NaN where no tile covers it).
+    """
+    coords = np.asarray((route.get("geometry") or {}).get("coordinates") or [], dtype=np.float64)
+    if coords.ndim != 2 or len(coords) < 2:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+    lon_r, lat_r = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    dist = haversine_batch(lat_r[:-1], lon_r[:-1], lat_r[1:], lon_r[1:]) * 1000.0
+    speed = _annotation_speed(route, len(dist))
+    if speed is None:
+        speed = _step_speed(route, dist)
+    return dist, speed, heights(coords[:, 1], coords[:, 0])
+
+
+def _annotation_speed(route: dict, n: int) -> np.ndarray | None:
+    legs = route.get("legs") or []
+    parts = [leg.get("annotation", {}).get("speed") for leg in legs]
+    if not parts or any(p is None for p in parts):
+        return None
+    speed = np.concatenate([np.asarray(p, dtype=np.float64) for p in parts])
+    return speed if len(speed) == n else None
+
+
+def _step_speed(route: dict, dist: np.ndarray) -> np.ndarray:
+    """Assign each segment the average speed of the step it falls in."""
+    steps = [s for leg in route.get("legs") or [] for s in leg.get("steps") or []]
+    step_d = np.array([s.get("distance", 0.0) for s in steps], dtype=np.float64)
+    step_t = np.array([s.get("duration", 0.0) for s in steps], dtype=np.float64)
+    total_d, total_t = route.get("distance", 0.0), route.get("duration", 0.0)
+    fallback = total_d / total_t if total_t > 0 else 50 / 3.6
+    if not len(steps):
+        return np.full(len(dist), fallback)
+    step_v = np.divide(step_d, step_t, out=np.full(len(steps), fallback), where=step_t > 0)
+    mid = np.cumsum(dist) - dist / 2
+    # Geometry and step lengths disagree slightly; scale onto the step distances
+    mid *= step_d.sum() / mid[-1] if mid[-1] > 0 else 0.0
+    idx = np.minimum(np.searchsorted(np.cumsum(step_d), mid), len(steps) - 1)
+    return step_v[idx]
+
+
+def simulate(data: BatteryInput, distance_m: np.ndarray, speed_mps: np.ndarray,
+             elevation_m: np.ndarray | None = None, start_soc: float = 100.0) -> dict:
+    """Energy use per segment and the state-of-charge curve along the route.
+
+    Without DEM heights the trip's Elevation_Gain_m is spread over the route
+    by distance as climbing with no descent.
+    """
+    n = len(distance_m)
+    mass = data.Vehicle_Weight_kg + PAYLOAD_KG
+    eff = min(max(data.Motor_Efficiency, 0.05), 1.0)
+    speed = np.maximum(speed_mps, 0.5)
+    total_m = float(distance_m.sum())
+
+    if elevation_m is not None and n and not np.isnan(elevation_m).all():
+        elev = elevation_m
+        valid = ~np.isnan(elev)
+        if not valid.all():
+            x = np.concatenate([[0.0], np.cumsum(distance_m)])
+            elev = np.interp(x, x[valid], elev[valid])
+        rise = np.diff(elev)
+    else:
+        rise = distance_m * (data.Elevation_Gain_m / total_m) if total_m > 0 else np.zeros(n)
+    sin_t = np.divide(rise, np.hypot(distance_m, rise), out=np.zeros(n), where=distance_m > 0)
+    cos_t = np.sqrt(1.0 - sin_t ** 2)
+
+    # Air density from temperature; wind from an unknown direction adds w^2/2 on average
+    rho = 1.225 * 288.15 / (273.15 + data.Avg_Temperature_C)
+    v2 = speed ** 2 + 0.5 * data.Wind_Speed_mps ** 2
+
+    rolling = data.Rolling_Resistance_Coeff * mass * G * cos_t * distance_m
+    aero = 0.5 * rho * data.Drag_Coefficient * data.Frontal_Area_m2 * v2 * distance_m
+    grade = mass * G * sin_t * distance_m
+    inertia = 0.5 * mass * np.diff(speed ** 2, prepend=0.0)
+    wheel = rolling + aero + grade + inertia
+
+    battery = np.where(wheel > 0, wheel / eff, wheel * eff * REGEN_EFFICIENCY) / J_PER_KWH
+    duration_s = distance_m / speed
+    aux_kw = AUX_BASE_KW + min(HVAC_MAX_KW, HVAC_KW_PER_C * abs(data.Avg_Temperature_C - HVAC_COMFORT_C))
+    segment_kwh = battery + aux_kw * duration_s / 3600.0
+
+    usable_kwh = data.Battery_Capacity_kWh * ((data.SoH_Percent or 100.0) / 100.0)
+    used = np.cumsum(segment_kwh)
+    soc = start_soc - 100.0 * used / usable_kwh if usable_kwh > 0 else np.full(n, start_soc)
+    cum_km = np.cumsum(distance_m) / 1000.0
+    empty = np.flatnonzero(soc <= 0)
+    total_kwh = float(used[-1]) if n else 0.0
+
+    return {
+        "distance_km": cum_km,
+        "segment_kwh": segment_kwh,
+        "soc_percent": np.maximum(soc, 0.0),
+        "energy_kwh": total_kwh,
+        "kwh_per_km": total_kwh / (total_m / 1000.0) if total_m > 0 else 0.0,
+        "regen_kwh": abs(float(battery[battery < 0].sum())),
+        "depleted_at_km": float(cum_km[empty[0]]) if len(empty) else None,
+        "breakdown_kwh": {
+            "rolling": float(rolling.sum() / eff / J_PER_KWH),
+            "aero": float(aero.sum() / eff / J_PER_KWH),
+            "grade": float(grade[grade > 0].sum() / eff / J_PER_KWH),
+            "aux": float(aux_kw * duration_s.sum() / 3600.0),
+        },
+    }
+
+
+def simulate_route(data: BatteryInput, route: dict, start_soc: float = 100.0) -> dict:
+    dist, speed, elev = route_segments(route)
+    return simulate(data, dist, speed, elev, start_soc)
+
+
+def soc_curve(result: dict, max_points: int = 100) -> list[list[float]]:
+    """Downsampled [[km, soc_percent], ...] for API responses."""
+    km, soc = result["distance_km"], result["soc_percent"]
+    if not len(km):
+        return []
+    idx = np.unique(np.linspace(0, len(km) - 1, min(max_points, len(km))).astype(np.int64))
+    return [[round(float(k), 2), round(float(s), 1)] for k, s in zip(km[idx], soc[idx])]
@@ -1,10 +1,12 @@
 """Geospatial utility functions."""
 import numpy as np
 
+EARTH_RADIUS_KM = 6371.0
+
 
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Return the great-circle distance in km between two lat/lon points."""
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
     dlat = lat2 - lat1
     dlon = lon2 - lon1
@@ -12,6 +14,31 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return R * 2 * np.arcsin(np.sqrt(a))
 
 
+def haversine_batch(lat1_rad, lon1_rad, lat2_rad, lon2_rad) -> np.ndarray:
+    """Vectorised haversine in km. Inputs are in radians and broadcast like
+    any NumPy ufunc, e.g. one point against an array of stations.
+    """
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lonlat_to_mercator(lon, lat):
+    """Project lon/lat degrees to normalised Web Mercator (x, y) in [0, 1).
+    y grows southwards, matching XYZ tile rows; points beyond the Mercator
+    latitude limit are clamped onto the edge tiles.
+    """
+    lat = np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+    edge = np.nextafter(1.0, 0.0)
+    return np.clip(x, 0.0, edge), np.clip(y, 0.0, edge)
+
+
 def parse_coords(loc_str: str) -> str:
     """Parse 'lat,lon' string and return 'lon,lat' (Mapbox format).
     Raises ValueError if the input is not parseable coordinates.
@@ -24,10 +51,22 @@ def parse_coords(loc_str: str) -> str:
 
 
 def calculate_elevation_changes(geometry: dict) -> float:
-    """Estimate elevation gain in metres from a GeoJSON geometry.
-    Uses a simple simulation based on route shape complexity.
-    In production, replace with real elevation data (e.g. Mapbox Elevation API).
+    """Total elevation gain in metres along a GeoJSON LineString.
+    Uses the DEM tiles in app.utils.elevation; where no tile covers the route
+    it falls back to estimate_elevation_gain().
     """
+    from app.utils.elevation import route_profile  # elevation imports this module
+
+    if not geometry.get("coordinates"):
+        return 0.0
+    profile = route_profile(geometry)
+    if profile is not None:
+        return profile["gain_m"]
+    return estimate_elevation_gain(geometry)
+
+
+def estimate_elevation_gain(geometry: dict) -> float:
+    """Rough elevation gain from the route's shape complexity, for routes no DEM tile covers."""
     coordinates = geometry.get("coordinates", [])
     if not coordinates:
         return 0.0
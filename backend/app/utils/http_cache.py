@@ -0,0 +1,83 @@
+"""Pre-serialized, pre-compressed response bodies with strong ETags."""
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def dumps(obj) -> bytes:
+    """Serialize obj to compact JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+@dataclass(frozen=True)
+class EncodedPayload:
+    body: bytes
+    gzip: bytes
+    br: bytes | None
+    etag: str
+    media_type: str = "application/json"
+
+    @classmethod
+    def from_bytes(cls, body: bytes, media_type: str = "application/json") -> "EncodedPayload":
+        return cls(
+            body=body,
+            gzip=gzip.compress(body, compresslevel=6, mtime=0),
+            br=brotli.compress(body, quality=9) if brotli is not None else None,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            media_type=media_type,
+        )
+
+    @classmethod
+    def from_obj(cls, obj, media_type: str = "application/json") -> "EncodedPayload":
+        return cls.from_bytes(dumps(obj), media_type)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def payload_response(request: Request, payload: EncodedPayload,
+                     cache_control: str = "no-cache") -> Response:
+    """Serve payload with ETag revalidation and the best encoding the client accepts."""
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match", ""), payload.etag):
+        return Response(status_code=304, headers=headers)
+
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    if payload.br is not None and "br" in accepted:
+        body, headers["Content-Encoding"] = payload.br, "br"
+    elif "gzip" in accepted:
+        body, headers["Content-Encoding"] = payload.gzip, "gzip"
+    else:
+        body = payload.body
+    return Response(content=body, media_type=payload.media_type, headers=headers)
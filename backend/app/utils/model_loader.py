@@ -1,13 +1,121 @@
-"""Load the ML model once at import time."""
+"""
+Model registry: lazy / background loading and hot reload of the ML model.
+
+The pickle is loaded with joblib's mmap_mode so large NumPy arrays inside it
+are memory-mapped and shared between worker processes. The file is re-checked
+every MODEL_RELOAD_INTERVAL_S seconds; a new version is loaded in the
+background and swapped in, while the previous model keeps serving.
+"""
+import os
+import threading
+import time
 import joblib
 from pathlib import Path
 
+from app.core.config import settings
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent  # → backend/
-MODEL_PATH = BASE_DIR / "ML_Models" / "ev_battery_model.pkl"
-
-try:
-    model = joblib.load(MODEL_PATH)
-    print(f"Model loaded from {MODEL_PATH}")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
+MODEL_PATH = Path(settings.MODEL_PATH) if settings.MODEL_PATH else BASE_DIR / "ML_Models" / "ev_battery_model.pkl"
+
+
+class ModelRegistry:
+    def __init__(self, path: Path, mmap_mode: str | None = "r", check_interval: float = 5.0):
+        self.path = Path(path)
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._model = None
+        self._version: str | None = None
+        self._loaded: tuple = (None, None)  # (model, version), swapped as one object
+        self._info: dict = {}
+        self._error: str | None = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._reloading: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    @property
+    def version(self) -> str | None:
+        return self._version
+
+    def _file_version(self) -> str | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    def load(self):
+        """Load the model file now (if it changed) and swap it in. Returns the model or None."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            version = self._file_version()
+            if version is None:
+                self._error = f"Model file not found: {self.path}"
+                print(f"Error loading model: {self._error}")
+                return self._model
+            if version == self._version:
+                return self._model
+            t0 = time.perf_counter()
+            try:
+                model = joblib.load(self.path, mmap_mode=self.mmap_mode)
+            except Exception as e:
+                self._error = str(e)
+                print(f"Error loading model: {e}")
+                return self._model
+            self._loaded = (model, version)
+            self._model, self._version, self._error = model, version, None
+            self._info = {
+                "load_time_ms": round((time.perf_counter() - t0) * 1000, 2),
+                "size_bytes": os.path.getsize(self.path),
+                "loaded_at": time.time(),
+            }
+            print(f"Model loaded from {self.path} ({self._info['load_time_ms']} ms)")
+            return model
+
+    def load_in_background(self) -> threading.Thread:
+        """Start loading without blocking startup; get() waits for it if needed."""
+        with self._lock:
+            if self._reloading is None or not self._reloading.is_alive():
+                self._reloading = threading.Thread(target=self.load, name="model-loader", daemon=True)
+                self._reloading.start()
+            return self._reloading
+
+    def get(self):
+        """Return the current model, loading it on first use and hot-reloading on change."""
+        model = self._model
+        if model is None:
+            loader = self._reloading
+            if loader is not None and loader.is_alive():
+                loader.join()
+                return self._model
+            if time.monotonic() - self._last_check >= self.check_interval or self._last_check == 0.0:
+                return self.load()
+            with self._lock:  # a concurrent first load may still be running
+                return self._model
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self._last_check = time.monotonic()
+            if self._file_version() not in (None, self._version):
+                self.load_in_background()
+        return model
+
+    def current(self) -> tuple:
+        """Like get(), but return (model, version) read together so they always match."""
+        self.get()
+        return self._loaded
+
+    def info(self) -> dict:
+        return {
+            "name": self.path.stem,
+            "path": str(self.path),
+            "loaded": self.ready,
+            "version": self._version,
+            "mmap_mode": self.mmap_mode,
+            "error": self._error,
+            **self._info,
+        }
+
+
+registry = ModelRegistry(MODEL_PATH, settings.MODEL_MMAP_MODE or None, settings.MODEL_RELOAD_INTERVAL_S)
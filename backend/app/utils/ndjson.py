@@ -0,0 +1,17 @@
+"""Newline-delimited JSON request bodies, read incrementally as they arrive."""
+from fastapi import Request
+
+NDJSON = "application/x-ndjson"
+
+
+async def ndjson_lines(request: Request):
+    """(line number, raw line) pairs from the request body as it arrives."""
+    buffer, number = b"", 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line
+    if buffer:
+        yield number + 1, buffer
@@ -0,0 +1,60 @@
+"""
+Per-request latency of the prediction hot path: the old data_to_dataframe
+path versus the precompiled FeatureEncoder.
+
+Run from backend/:
+    python -m benchmarks.bench_feature_encoder [--iterations 5000]
+"""
+import argparse
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.schema import BatteryInput
+from app.services import model_service
+from app.services.model_service import data_to_dataframe, encoder
+from app.utils.model_loader import registry
+from benchmarks.report import print_table, timeit
+
+SAMPLE = BatteryInput(
+    Internal_Resistance_Ohm=0.05, Total_Charging_Cycles=100, Battery_Capacity_kWh=75.0,
+    Fast_Charge_Ratio=0.3, Avg_Temperature_C=25.0, Vehicle_Age_Months=12,
+    Avg_Discharge_Rate_C=1.0, SoH_Percent=95.0, Car_Model_Tesla_Model_3=1,
+    Battery_Type_NMC=1, Driving_Style_Conservative=1, Vehicle_Weight_kg=1800.0,
+    Drag_Coefficient=0.25, Frontal_Area_m2=2.4, Rolling_Resistance_Coeff=0.01,
+    Motor_Efficiency=0.95, Trip_Distance_km=100.0, Elevation_Gain_m=50.0,
+    Traffic_Index=5.0, Avg_Speed_kmph=60.0, Humidity_Percent=60.0, Wind_Speed_mps=5.0,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    old_row = data_to_dataframe(SAMPLE).to_numpy(dtype=np.float64)[0]
+    assert np.array_equal(old_row, encoder.encode(SAMPLE)), "encoder output differs from data_to_dataframe"
+
+    buf = np.zeros(len(encoder.columns))
+    results = {
+        "encode/data_to_dataframe": timeit(lambda: data_to_dataframe(SAMPLE), args.iterations),
+        "encode/FeatureEncoder.encode": timeit(lambda: encoder.encode(SAMPLE), args.iterations),
+        "encode/FeatureEncoder.encode_into": timeit(lambda: encoder.encode_into(SAMPLE, buf), args.iterations),
+    }
+
+    model = registry.get()
+    if model:
+        settings.PREDICTION_CACHE_ENABLED = False  # time the model path, not cache hits
+        n = max(args.iterations // 10, 100)
+        results["request/old (DataFrame + predict)"] = timeit(
+            lambda: model.predict(data_to_dataframe(SAMPLE)), n
+        )
+        results["request/new (run_prediction)"] = timeit(lambda: model_service.run_prediction(SAMPLE), n)
+    else:
+        print("Model not loaded; timing feature encoding only.")
+
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
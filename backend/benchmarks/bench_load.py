@@ -0,0 +1,276 @@
+"""
+In-process load generator for every /api/v1 route.
+
+Requests go through httpx's ASGI transport straight into the app, with
+Mapbox and MongoDB replaced by the stand-ins in benchmarks.stubs, so runs are
+repeatable on a laptop and in CI. Each scenario sends --requests requests
+(after a short warm-up) from --concurrency concurrent clients and records
+latency percentiles, throughput and status codes. Results go to JSON for
+comparison between runs.
+
+Run from backend/:
+    python -m benchmarks.bench_load [--concurrency 16] [--requests 200] [--only predict,best-station]
+                                    [--out FILE] [--compare OLD.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+
+from app.core import database, executors
+from app.api.v1.endpoints import route as route_endpoint
+from app.main import app
+from app.services.station_store import station_store
+from app.utils.model_loader import registry
+from benchmarks.bench_feature_encoder import SAMPLE
+from benchmarks.report import load_baseline, print_table, summarize, write_results
+from benchmarks.stubs import FakeMapbox, FakeMongoClient, fake_bulk_ops
+
+API = "/api/v1"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # rng -> (path, params, json body or None, raw content or None)
+    make: Callable[[random.Random], tuple]
+    max_requests: int | None = None   # cap for heavy endpoints (full payloads, reloads)
+
+
+def _battery(rng: random.Random) -> dict:
+    row = SAMPLE.model_dump()
+    row.update(
+        SoH_Percent=round(rng.uniform(70, 100), 1),
+        Trip_Distance_km=round(rng.uniform(5, 400), 1),
+        Avg_Speed_kmph=round(rng.uniform(20, 110), 1),
+        Avg_Temperature_C=round(rng.uniform(-10, 40), 1),
+    )
+    return row
+
+
+def _profile(rng: random.Random, user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "ev_model": rng.choice(["Tesla Model 3", "Hyundai Ioniq 5", "Ford Mustang Mach-E", "Wuling Air EV"]),
+        "battery_capacity": rng.choice([50.0, 60.0, 75.0, 82.0]),
+        "current_battery": rng.randint(10, 100),
+        "battery_health": rng.randint(70, 100),
+        "vehicle_load": rng.choice([None, 100.0, 300.0]),
+        "ambient_temperature": rng.choice([None, 5.0, 25.0]),
+    }
+
+
+def build_scenarios(snap, profile_ids: list[str]) -> list[Scenario]:
+    """One scenario per /api/v1 route (and method), with payloads drawn from real station locations."""
+    def station_point(rng, spread=0.2):
+        if snap is None or not len(snap):
+            return rng.uniform(30, 45), rng.uniform(-120, -75)
+        i = rng.randrange(len(snap))
+        return float(snap.lat[i]) + rng.gauss(0, spread), float(snap.lon[i]) + rng.gauss(0, spread)
+
+    def tile(rng):
+        lat, lon = station_point(rng, 0.0)
+        z = rng.randint(4, 14)
+        n = 2 ** z
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+        return f"{API}/charging-stations/tiles/{z}/{x}/{y}"
+
+    def bbox(rng):
+        lat, lon = station_point(rng, 0.0)
+        d = rng.uniform(0.2, 3.0)
+        south, north = max(lat - d, -90.0), min(lat + d, 90.0)
+        return {"bbox": f"{lon - d},{south},{lon + d},{north}", "zoom": rng.choice([6, 9, 12])}
+
+    def trip(rng, spread):
+        """Start near a station, end a few hundred km away."""
+        lat1, lon1 = station_point(rng, spread)
+        bearing, deg = rng.uniform(0, 2 * math.pi), rng.uniform(0.5, 2.5)
+        lat2 = max(min(lat1 + deg * math.cos(bearing), 85.0), -85.0)
+        return (lat1, lon1), (lat2, lon1 + deg * math.sin(bearing) / max(math.cos(math.radians(lat1)), 0.2))
+
+    def route(rng):
+        (lat1, lon1), (lat2, lon2) = trip(rng, 0.5)
+        body = _battery(rng)
+        if rng.random() < 0.5:
+            body.update(start_location=f"{lat1:.5f},{lon1:.5f}", end_location=f"{lat2:.5f},{lon2:.5f}")
+        else:
+            body.update(start_location=rng.choice(["New York, NY", "Boston, MA", "Chicago, IL"]),
+                        end_location=rng.choice(["Philadelphia, PA", "Albany, NY", "Detroit, MI"]))
+        return f"{API}/optimize-route", None, body, None
+
+    def plan(rng):
+        (lat1, lon1), (lat2, lon2) = trip(rng, 0.0)
+        return f"{API}/plan-trip", {
+            "start_lat": lat1, "start_lon": lon1, "end_lat": lat2, "end_lon": lon2,
+            "battery_percent": rng.uniform(30, 100), "optimize": rng.choice(["time", "cost"]),
+        }, None, None
+
+    def best(rng):
+        lat, lon = station_point(rng)
+        params = {"vehicle_lat": lat, "vehicle_lon": lon, "battery_percent": rng.uniform(10, 90)}
+        if rng.random() < 0.3:
+            params.update(k=10, sort_by="cost", min_kw=50)
+        return f"{API}/best-station", params, None, None
+
+    def bulk(rng):
+        base = rng.randrange(1_000_000)
+        lines = "\n".join(json.dumps(_profile(rng, f"bulk-{base + i}")) for i in range(500))
+        return f"{API}/ev-profiles/bulk", None, None, lines.encode()
+
+    def batch(rng):
+        return f"{API}/predict/batch", None, [_battery(rng) for _ in range(100)], None
+
+    return [
+        Scenario("predict", "POST", lambda r: (f"{API}/predict", None, _battery(r), None)),
+        Scenario("predict-batch", "POST", batch),
+        Scenario("predict-stats", "GET", lambda r: (f"{API}/predict/stats", None, None, None)),
+        Scenario("optimize-route", "POST", route),
+        Scenario("mapbox-stats", "GET", lambda r: (f"{API}/mapbox/stats", None, None, None)),
+        Scenario("charging-stations", "GET", lambda r: (f"{API}/charging-stations", None, None, None),
+                 max_requests=50),
+        Scenario("charging-stations-bbox", "GET", lambda r: (f"{API}/charging-stations", bbox(r), None, None)),
+        Scenario("charging-tiles", "GET", lambda r: (tile(r), None, None, None)),
+        Scenario("charging-stats", "GET", lambda r: (f"{API}/charging-stations/stats", None, None, None)),
+        Scenario("best-station", "GET", best),
+        Scenario("plan-trip", "GET", plan),
+        Scenario("profile-create", "POST",
+                 lambda r: (f"{API}/ev-profile", None, _profile(r, f"user-{r.randrange(100_000)}"), None)),
+        Scenario("profile-get", "GET", lambda r: (f"{API}/ev-profile/{r.choice(profile_ids)}", None, None, None)),
+        Scenario("profile-update", "PUT", lambda r: (
+            f"{API}/ev-profile/{r.choice(profile_ids)}", None,
+            {k: v for k, v in _profile(r, "").items() if k != "user_id"}, None)),
+        Scenario("profiles-bulk", "POST", bulk, max_requests=20),
+        Scenario("profiles-export", "GET", lambda r: (f"{API}/ev-profiles/export", None, None, None),
+                 max_requests=20),
+        Scenario("profiles-scores", "GET", lambda r: (f"{API}/ev-profiles/scores", None, None, None),
+                 max_requests=20),
+        Scenario("models", "GET", lambda r: (f"{API}/models", None, None, None)),
+        Scenario("models-reload", "POST", lambda r: (f"{API}/models/reload", None, None, None), max_requests=5),
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int,
+                       warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    total = min(requests, scenario.max_requests or requests)
+    # Build payloads up front so generating them isn't timed
+    calls = [scenario.make(rng) for _ in range(warmup + total)]
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    next_call = 0
+
+    async def send(call) -> int:
+        path, params, body, content = call
+        headers = {"content-type": "application/x-ndjson"} if content is not None else None
+        resp = await client.request(scenario.method, path, params=params, json=body,
+                                    content=content, headers=headers)
+        await resp.aread()
+        return resp.status_code
+
+    for call in calls[:warmup]:
+        await send(call)
+
+    async def worker():
+        nonlocal next_call
+        while next_call < len(calls):
+            call = calls[next_call]
+            next_call += 1
+            t0 = time.perf_counter()
+            try:
+                status = await send(call)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[str(status)] += 1
+
+    next_call = warmup
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - t0
+
+    result = summarize(latencies, elapsed)
+    result["errors"] = sum(n for s, n in statuses.items() if not s.startswith("2"))
+    result["status"] = dict(statuses)
+    return result
+
+
+async def run(args) -> dict:
+    executors.start()
+    registry.get()
+    try:
+        snap = station_store.load()
+    except Exception as e:
+        snap = None
+        print(f"Stations not loaded: {e}")
+
+    # Stand-ins are swapped in for this run only and restored afterwards
+    real_mapbox = route_endpoint.route_service.mapbox
+    route_endpoint.route_service.mapbox = FakeMapbox(latency_ms=args.mapbox_latency_ms)
+    try:
+        with fake_bulk_ops(database):
+            await database.init_db(FakeMongoClient(latency_ms=args.mongo_latency_ms))
+            try:
+                return await _run_scenarios(args, snap)
+            finally:
+                await database.close_db()
+    finally:
+        route_endpoint.route_service.mapbox = real_mapbox
+        executors.shutdown()
+
+
+async def _run_scenarios(args, snap) -> dict:
+    rng = random.Random(args.seed)
+    profile_ids = [f"seed-{i}" for i in range(1000)]
+    for user_id in profile_ids:
+        await database.save_ev_profile(user_id, _profile(rng, user_id))
+
+    scenarios = build_scenarios(snap, profile_ids)
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [s for s in scenarios if s.name in wanted]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for i, scenario in enumerate(scenarios):
+            results[scenario.name] = await run_scenario(
+                client, scenario, args.requests, args.concurrency, args.warmup, args.seed + i
+            )
+            r = results[scenario.name]
+            print(f"  {scenario.name}: {r.get('count', 0)} requests, p95 {r.get('p95_ms', 0):.1f} ms, "
+                  f"{r.get('rps', 0):.0f} rps, status {r['status']}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--mapbox-latency-ms", type=float, default=50.0, help="simulated Mapbox round trip")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="simulated MongoDB round trip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result JSON path (default benchmarks/results/load-<time>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print()
+    print_table(results, load_baseline(args.compare))
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    path = write_results("load", results, params, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmarks for the per-request building blocks: haversine,
+data_to_dataframe, run_prediction and ChargingService.get_best_station.
+
+Run from backend/:
+    python -m benchmarks.bench_micro [--iterations 2000] [--out FILE] [--compare OLD.json]
+"""
+import argparse
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import model_service
+from app.services.charging_service import ChargingService
+from app.services.model_service import data_to_dataframe
+from app.utils.geo import haversine, haversine_batch
+from app.utils.model_loader import registry
+from benchmarks.bench_feature_encoder import SAMPLE
+from benchmarks.report import load_baseline, print_table, timeit, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result JSON path (default benchmarks/results/micro-<time>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+    n = args.iterations
+    rng = np.random.default_rng(args.seed)
+
+    points = np.column_stack([rng.uniform(25, 49, n), rng.uniform(-124, -67, n)])
+    lat_r, lon_r = np.radians(rng.uniform(25, 49, 10_000)), np.radians(rng.uniform(-124, -67, 10_000))
+    results = {
+        "geo/haversine": timeit(haversine, n, lambda i: (*points[i], *points[-i - 1])),
+        "geo/haversine_batch[10k]": timeit(
+            haversine_batch, max(n // 20, 10), lambda i: (lat_r, lon_r, lat_r[i], lon_r[i])
+        ),
+        "model/data_to_dataframe": timeit(data_to_dataframe, n, lambda i: (SAMPLE,)),
+    }
+
+    if registry.get():
+        settings.PREDICTION_CACHE_ENABLED = False  # time the model, not cache hits
+        results["model/run_prediction"] = timeit(model_service.run_prediction, n, lambda i: (SAMPLE,))
+    else:
+        print("Model not loaded; skipping run_prediction.")
+
+    service = ChargingService()
+    try:
+        snap = service.store.get()
+    except Exception as e:
+        snap = None
+        print(f"Stations not loaded ({e}); skipping get_best_station.")
+    if snap is not None and len(snap):
+        # Vehicles near real stations so most lookups succeed
+        near = rng.integers(0, len(snap), n)
+        jitter = rng.normal(0, 0.2, (n, 2))
+
+        def best(i, **kw):
+            try:
+                service.get_best_station(float(snap.lat[near[i]] + jitter[i, 0]),
+                                         float(snap.lon[near[i]] + jitter[i, 1]), 40.0, 60.0, 6.0, **kw)
+            except Exception:
+                pass  # 404 when nothing is in range still costs a full query
+
+        results["charging/get_best_station"] = timeit(best, n, lambda i: (i,))
+        results["charging/get_best_station[k=10,cost]"] = timeit(
+            lambda i: best(i, k=10, sort_by="cost"), n, lambda i: (i,)
+        )
+
+    print_table(results, load_baseline(args.compare))
+    path = write_results("micro", results, {"iterations": n, "seed": args.seed}, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
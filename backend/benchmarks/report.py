@@ -0,0 +1,108 @@
+"""
+Shared result handling for the benchmark scripts: a timing loop, latency
+percentiles, JSON result files and a side-by-side comparison with an earlier
+run.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def summarize(latencies_ms, elapsed_s: float | None = None) -> dict:
+    """p50/p95/p99/mean/max of a list of latencies (ms), plus RPS when elapsed_s is given."""
+    a = np.asarray(latencies_ms, dtype=np.float64)
+    if a.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    out = {
+        "count": int(a.size),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(a.mean()), 3),
+        "max_ms": round(float(a.max()), 3),
+    }
+    if elapsed_s:
+        out["rps"] = round(a.size / elapsed_s, 1)
+    return out
+
+
+def timeit(fn, iterations: int, args_for=None) -> dict:
+    """Latency summary (ms) of `iterations` calls; args_for(i) varies the arguments per call."""
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        args = args_for(i) if args_for else ()
+        t0 = time.perf_counter()
+        fn(*args)
+        samples[i] = (time.perf_counter() - t0) * 1000
+    return summarize(samples)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(kind: str, results: dict, params: dict, out: str | None = None) -> str:
+    """Write {"meta", "params", "results"} to `out` (default results/<kind>-<timestamp>.json)."""
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    doc = {
+        "meta": {
+            "kind": kind,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "params": params,
+        "results": results,
+    }
+    with open(out, "w") as f:
+        json.dump(doc, f, indent=2)
+    return out
+
+
+def print_table(results: dict, baseline: dict | None = None):
+    """One line per benchmark; with a baseline, p95 and RPS changes in percent."""
+    width = max((len(k) for k in results), default=0)
+    for name, r in results.items():
+        if not r.get("count"):
+            print(f"{name:<{width}}  (no samples)")
+            continue
+        line = (f"{name:<{width}}  p50 {r['p50_ms']:>9.3f}  p95 {r['p95_ms']:>9.3f}  "
+                f"p99 {r['p99_ms']:>9.3f} ms")
+        if "rps" in r:
+            line += f"  {r['rps']:>8.1f} rps"
+        if r.get("errors"):
+            line += f"  errors {r['errors']}"
+        old = (baseline or {}).get(name)
+        if old and old.get("count"):
+            line += f"  | p95 {_delta(r['p95_ms'], old['p95_ms'])}"
+            if "rps" in r and "rps" in old:
+                line += f"  rps {_delta(r['rps'], old['rps'])}"
+        print(line)
+
+
+def _delta(new: float, old: float) -> str:
+    return f"{100.0 * (new - old) / old:+6.1f}%" if old else "   n/a"
+
+
+def load_baseline(path: str | None) -> dict | None:
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f).get("results")
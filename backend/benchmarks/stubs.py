@@ -0,0 +1,199 @@
+"""
+In-process stand-ins for Mapbox and MongoDB, so load runs measure this
+service rather than the network or a shared database.
+
+FakeMapbox has the async geocode() / get_directions() interface RouteService
+expects and returns Mapbox-shaped routes (geometry, legs, steps and speed
+annotations). FakeMongoClient implements the slice of Motor used by
+app.core.database; its bulk_write takes the UpdateOne below, which
+fake_bulk_ops() swaps in for pymongo's while a load run is active, so no
+private pymongo attributes are read. Both
+can add a fixed latency per call to mimic the real round trip.
+"""
+import asyncio
+import contextlib
+import hashlib
+import math
+
+import numpy as np
+from pymongo import ReturnDocument
+
+
+class FakeMapbox:
+    def __init__(self, latency_ms: float = 0.0, alternatives: int = 2, point_spacing_m: float = 200.0):
+        self.latency = latency_ms / 1000.0
+        self.alternatives = alternatives
+        self.point_spacing_m = point_spacing_m
+        self.calls = {"geocode": 0, "directions": 0}
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def geocode(self, location: str) -> str | None:
+        """Deterministic 'lon,lat' inside the continental US for any place name."""
+        self.calls["geocode"] += 1
+        await self._wait()
+        h = int.from_bytes(hashlib.blake2b(location.lower().encode(), digest_size=8).digest(), "big")
+        lon = -124.0 + (h % 10_000) / 10_000 * 54.0
+        lat = 26.0 + (h // 10_000 % 10_000) / 10_000 * 22.0
+        return f"{lon:.6f},{lat:.6f}"
+
+    async def get_directions(self, start: str, end: str) -> dict:
+        self.calls["directions"] += 1
+        await self._wait()
+        (lon1, lat1), (lon2, lat2) = (tuple(map(float, p.split(","))) for p in (start, end))
+        return {"routes": [self._route(lon1, lat1, lon2, lat2, bend=0.15 * i) for i in range(self.alternatives)]}
+
+    def _route(self, lon1, lat1, lon2, lat2, bend: float) -> dict:
+        # A straight line bowed sideways by `bend`, sampled every point_spacing_m
+        dx, dy = lon2 - lon1, lat2 - lat1
+        approx_m = math.hypot(dx * 111_000 * math.cos(math.radians(lat1)), dy * 111_000)
+        n = max(2, min(int(approx_m / self.point_spacing_m), 5000))
+        t = np.linspace(0.0, 1.0, n)
+        off = bend * np.sin(np.pi * t)
+        lon, lat = lon1 + dx * t - dy * off, lat1 + dy * t + dx * off
+        seg = np.hypot(np.diff(lon) * 111_000 * np.cos(np.radians(lat[:-1])), np.diff(lat) * 111_000)
+        speed = np.where(np.arange(len(seg)) % 50 < 40, 27.0, 14.0)  # highway with slower stretches
+        seg_t = seg / speed
+        half = len(seg) // 2
+        distance, duration = float(seg.sum()), float(seg_t.sum())
+        steps = [
+            {"distance": float(seg[:half].sum()), "duration": float(seg_t[:half].sum())},
+            {"distance": float(seg[half:].sum()), "duration": float(seg_t[half:].sum())},
+        ]
+        return {
+            "distance": distance,
+            "duration": duration,
+            "geometry": {"type": "LineString", "coordinates": np.column_stack([lon, lat]).tolist()},
+            "legs": [{"distance": distance, "duration": duration, "steps": steps,
+                      "annotation": {"speed": speed.tolist()}}],
+        }
+
+
+class UpdateOne:
+    """Stand-in for pymongo.UpdateOne with public fields, for FakeCollection.bulk_write."""
+
+    def __init__(self, filter: dict, update: dict, upsert: bool = False):
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+
+@contextlib.contextmanager
+def fake_bulk_ops(database):
+    """Build database's bulk ops from the UpdateOne above for the duration of the block."""
+    original = database.UpdateOne
+    database.UpdateOne = UpdateOne
+    try:
+        yield
+    finally:
+        database.UpdateOne = original
+
+
+def _project(doc: dict, projection) -> dict:
+    if projection and projection.get("_id") == 0:
+        return {k: v for k, v in doc.items() if k != "_id"}
+    return dict(doc)
+
+
+class _Cursor:
+    def __init__(self, docs: list[dict], projection, latency: float, batch_size: int):
+        self._docs = docs
+        self._projection = projection
+        self._latency = latency
+        self._batch_size = max(batch_size, 1)
+
+    async def _iter(self):
+        for i, doc in enumerate(self._docs):
+            if self._latency and i % self._batch_size == 0:
+                await asyncio.sleep(self._latency)  # one getMore per batch
+            yield _project(doc, self._projection)
+
+    def __aiter__(self):
+        return self._iter()
+
+
+class FakeCollection:
+    """Documents keyed by user_id (the only filter app.core.database uses)."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.docs: dict[str, dict] = {}
+        self._next_id = 0
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_index(self, keys, unique: bool = False):
+        return f"{keys}_1"
+
+    async def find_one(self, filter: dict, projection=None):
+        await self._wait()
+        doc = self.docs.get(filter.get("user_id"))
+        return _project(doc, projection) if doc is not None else None
+
+    def _upsert(self, filter: dict, update: dict, upsert: bool):
+        key = filter["user_id"]
+        before = self.docs.get(key)
+        if before is None:
+            if not upsert:
+                return None, None
+            self._next_id += 1
+            after = {"_id": self._next_id, **filter, **update.get("$set", {})}
+        else:
+            after = {**before, **update.get("$set", {})}
+        self.docs[key] = after
+        return before, after
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection=None, upsert: bool = False,
+                                  return_document=ReturnDocument.BEFORE):
+        await self._wait()
+        before, after = self._upsert(filter, update, upsert)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return _project(doc, projection) if doc is not None else None
+
+    async def bulk_write(self, requests, ordered: bool = True):
+        await self._wait()
+        upserted = matched = 0
+        for op in requests:
+            if not isinstance(op, UpdateOne):
+                raise TypeError(f"FakeCollection.bulk_write expects benchmarks.stubs.UpdateOne, got {type(op)!r}")
+            before, _ = self._upsert(op.filter, op.update, op.upsert)
+            if before is None:
+                upserted += 1
+            else:
+                matched += 1
+
+        class _Result:
+            bulk_api_result = {"nUpserted": upserted, "nMatched": matched, "writeErrors": []}
+        return _Result()
+
+    def find(self, filter=None, projection=None, batch_size: int = 101):
+        return _Cursor(list(self.docs.values()), projection, self.latency, batch_size)
+
+
+class _FakeAdmin:
+    async def command(self, name: str):
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.admin = _FakeAdmin()
+        self._dbs: dict[str, dict] = {}
+
+    def __getitem__(self, db_name: str):
+        collections = self._dbs.setdefault(db_name, {})
+
+        class _Database:
+            def __getitem__(_, name: str) -> FakeCollection:
+                if name not in collections:
+                    collections[name] = FakeCollection(self.latency_ms)
+                return collections[name]
+        return _Database()
+
+    def close(self):
+        pass
@@ -0,0 +1,58 @@
+"""
+Production server: gunicorn master + uvicorn workers, with shared preloaded state.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+preload_app imports the app once in the master. when_ready then loads the
+model and station snapshot there and gc.freeze()s them (app.core.lifecycle),
+so forked workers share those pages copy-on-write instead of each holding its
+own copy. Pools and network/database clients are created per worker in the
+app's startup hook, after the fork.
+
+`kill -HUP <master pid>` reloads gracefully: the master re-reads the model and
+stations, starts fresh workers from it and lets the old ones finish their
+in-flight requests (up to GRACEFUL_TIMEOUT seconds) before they exit.
+
+Environment:
+    BIND                0.0.0.0:8000
+    WEB_CONCURRENCY     worker processes (default: CPU count)
+    GUNICORN_THREADS    CPU pool threads per worker (sets CPU_POOL_WORKERS)
+    KEEPALIVE           seconds an idle keep-alive connection is held (default 5)
+    TIMEOUT             seconds before a silent worker is restarted (default 60)
+    GRACEFUL_TIMEOUT    seconds workers get to drain on reload / shutdown (default 30)
+    MAX_REQUESTS        recycle a worker after this many requests (default 0 = never)
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+timeout = int(os.getenv("TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None  # heartbeat file off the container's overlay fs
+accesslog = os.getenv("ACCESS_LOG") or None
+
+# Per-process limits such as the Mapbox token buckets divide their share by this
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Uvicorn workers are single-threaded event loops, so gunicorn's own `threads`
+# does not apply; the thread count that matters is the per-worker CPU pool.
+# This file is read before the app is imported, so settings pick it up.
+if os.getenv("GUNICORN_THREADS"):
+    os.environ["CPU_POOL_WORKERS"] = os.environ["GUNICORN_THREADS"]
+
+
+def when_ready(server):
+    from app.core import lifecycle
+    lifecycle.preload()
+
+
+def on_reload(server):
+    # New workers fork from the master, so refresh its copy first
+    from app.core import lifecycle
+    lifecycle.preload()
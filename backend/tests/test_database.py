@@ -0,0 +1,150 @@
+"""
+Profile storage against mongomock_motor, wired in through init_db(client=...).
+
+Covers the upsert's is_new flag, the retry after losing an insert race on
+the unique user_id index, and the read cache's write-through / invalidation.
+"""
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+import mongomock  # noqa: E402
+from pymongo import UpdateOne  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+from app.core import database  # noqa: E402
+
+
+def _mock_runs_bulk_write() -> bool:
+    # Older mongomock can't take the ops of newer pymongo (see requirements-dev.txt)
+    try:
+        mongomock.MongoClient().db.probe.bulk_write([UpdateOne({"k": 1}, {"$set": {"k": 1}}, upsert=True)])
+    except TypeError:
+        return False
+    return True
+
+
+needs_bulk_write = pytest.mark.skipif(
+    not _mock_runs_bulk_write(), reason="installed mongomock can't run this pymongo's bulk_write ops"
+)
+
+PROFILE = {"ev_model": "Tesla Model 3", "battery_capacity": 75.0, "current_battery": 80, "battery_health": 95}
+
+
+def run(test):
+    """Run test(collection) against a fresh in-memory database."""
+    async def main():
+        client = mongomock_motor.AsyncMongoMockClient()
+        await database.init_db(client)
+        try:
+            return await test(client[database.DB_NAME][database.PROFILES])
+        finally:
+            await database.close_db()
+    return asyncio.run(main())
+
+
+class RacingCollection:
+    """Lets another writer insert the same user_id just before our upsert, `races` times."""
+
+    def __init__(self, col, races: int = 1):
+        self.col = col
+        self.races = races
+
+    async def find_one_and_update(self, *args, **kwargs):
+        if self.races:
+            self.races -= 1
+            await self.col.update_one({"user_id": "u1"}, {"$set": {"vehicle_load": 120.0}}, upsert=True)
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await self.col.find_one_and_update(*args, **kwargs)
+
+
+def test_save_reports_is_new_only_for_first_write():
+    async def test(col):
+        first = await database.save_ev_profile("u1", PROFILE)
+        second = await database.save_ev_profile("u1", {**PROFILE, "current_battery": 40})
+        assert first["success"] and first["is_new"]
+        assert second["success"] and not second["is_new"]
+        assert second["profile"]["current_battery"] == 40
+        assert await col.count_documents({"user_id": "u1"}) == 1
+    run(test)
+
+
+def test_unique_index_rejects_duplicate_user_id():
+    async def test(col):
+        await database.save_ev_profile("u1", PROFILE)
+        with pytest.raises(DuplicateKeyError):
+            await col.insert_one({**PROFILE, "user_id": "u1"})
+    run(test)
+
+
+def test_save_retries_after_losing_insert_race(monkeypatch):
+    async def test(col):
+        monkeypatch.setattr(database, "_get_collection", lambda: RacingCollection(col))
+        result = await database.save_ev_profile("u1", PROFILE)
+        assert not result["is_new"]  # the retry matched the other writer's document
+        assert result["profile"]["vehicle_load"] == 120.0
+        assert await col.count_documents({"user_id": "u1"}) == 1
+    run(test)
+
+
+def test_save_gives_up_after_second_race(monkeypatch):
+    async def test(col):
+        monkeypatch.setattr(database, "_get_collection", lambda: RacingCollection(col, races=2))
+        with pytest.raises(DuplicateKeyError):
+            await database.save_ev_profile("u1", PROFILE)
+    run(test)
+
+
+def test_writes_go_through_the_read_cache():
+    async def test(col):
+        await database.save_ev_profile("u1", PROFILE)
+        await col.delete_many({})  # only the cache still has it
+        cached = await database.get_ev_profile("u1")
+        assert cached["current_battery"] == 80
+
+        cached["current_battery"] = 0  # callers get a copy
+        assert (await database.get_ev_profile("u1"))["current_battery"] == 80
+
+        await database.save_ev_profile("u2", PROFILE)
+        updated = await database.update_ev_profile("u2", {"current_battery": 55})
+        assert updated["current_battery"] == 55
+        assert (await database.get_ev_profile("u2"))["current_battery"] == 55
+    run(test)
+
+
+def test_update_of_missing_profile_invalidates_cache():
+    async def test(col):
+        await database.save_ev_profile("u1", PROFILE)
+        await col.delete_many({})
+        assert await database.update_ev_profile("u1", {"current_battery": 10}) is None
+        assert await database.get_ev_profile("u1") is None
+    run(test)
+
+
+@needs_bulk_write
+def test_bulk_save_invalidates_cached_profiles():
+    async def test(col):
+        await database.save_ev_profile("u1", PROFILE)
+        assert (await database.get_ev_profile("u1"))["current_battery"] == 80
+        result = await database.bulk_save_ev_profiles([
+            {**PROFILE, "user_id": "u1", "current_battery": 30},
+            {**PROFILE, "user_id": "u2"},
+        ])
+        assert (result["inserted"], result["updated"], result["errors"]) == (1, 1, [])
+        assert (await database.get_ev_profile("u1"))["current_battery"] == 30
+    run(test)
+
+
+@needs_bulk_write
+def test_bulk_save_drops_duplicate_user_ids_keeping_the_last():
+    async def test(col):
+        result = await database.bulk_save_ev_profiles([
+            {**PROFILE, "user_id": "u1", "current_battery": 10},
+            {**PROFILE, "user_id": "u2"},
+            {**PROFILE, "user_id": "u1", "current_battery": 20},
+        ])
+        assert (result["inserted"], result["updated"], result["errors"]) == (2, 0, [])
+        assert result["duplicates"] == [{"index": 0, "superseded_by": 2}]
+        assert (await database.get_ev_profile("u1"))["current_battery"] == 20
+    run(test)
@@ -63,68 +63,122 @@ const ChargingStations = ({ routeData }) => {
     map.addControl(new mapboxgl.NavigationControl(), 'top-right');
     mapRef.current = map;
 
-    // ── Load all stations as a GeoJSON layer once the style is ready ──
-    map.on('load', () => {
-      fetch(`${API_URL}/charging-stations`)
-        .then((res) => res.json())
-        .then((geojson) => {
-          setStationCount(geojson.features?.length || 0);
+    // ── Load the stations in view as cacheable z/x/y tiles (clustered at low zoom) ──
+    // Tiles carry ETags, so revisited tiles are revalidated by the browser with 304s,
+    // and x wraps around, so views across the antimeridian or on world copies work.
+    const lonToTileX = (lon, n) => Math.floor(((lon + 180) / 360) * n);
+    const latToTileY = (lat, n) => {
+      const clamped = Math.max(-85.0511, Math.min(85.0511, lat));
+      const rad = (clamped * Math.PI) / 180;
+      const y = Math.floor(((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * n);
+      return Math.max(0, Math.min(n - 1, y));
+    };
+    const fetchTile = (key) =>
+      fetch(`${API_URL}/charging-stations/tiles/${key}`)
+        .then((res) => (res.ok ? res.json() : { features: [] }))
+        .then((geojson) => geojson.features || []);
+
+    let viewportRequest = 0;
+    const loadViewport = () => {
+      const request = ++viewportRequest;
+      const b = map.getBounds();
+      const z = Math.max(0, Math.min(22, Math.floor(map.getZoom())));
+      const n = 2 ** z;
+      const x0 = lonToTileX(b.getWest(), n);
+      const x1 = Math.min(lonToTileX(b.getEast(), n), x0 + n - 1); // at most one full turn
+      const y0 = latToTileY(b.getNorth(), n);
+      const y1 = latToTileY(b.getSouth(), n);
+      const keys = new Set();
+      for (let x = x0; x <= x1; x++) {
+        for (let y = y0; y <= y1; y++) keys.add(`${z}/${((x % n) + n) % n}/${y}`);
+      }
+      Promise.all([...keys].map(fetchTile))
+        .then((tiles) => {
+          if (request !== viewportRequest) return; // a newer move superseded this one
+          const features = tiles.flat();
+          setStationCount(
+            features.reduce((count, f) => count + (f.properties.point_count || 1), 0)
+          );
           setLoadingStations(false);
-
-          map.addSource('stations', { type: 'geojson', data: geojson });
-
-          // Glow halo
-          map.addLayer({
-            id: 'stations-halo',
-            type: 'circle',
-            source: 'stations',
-            paint: {
-              'circle-radius': 10,
-              'circle-color': '#69E300',
-              'circle-opacity': 0.15,
-              'circle-blur': 1,
-            },
-          });
-
-          // Main dot
-          map.addLayer({
-            id: 'stations-layer',
-            type: 'circle',
-            source: 'stations',
-            paint: {
-              'circle-radius': 5,
-              'circle-color': '#69E300',
-              'circle-stroke-width': 1.5,
-              'circle-stroke-color': '#fff',
-            },
-          });
-
-          // Popup on click
-          map.on('click', 'stations-layer', (e) => {
-            const { station_id, rating, cost } = e.features[0].properties;
-            const [lng, lat] = e.features[0].geometry.coordinates;
-            new mapboxgl.Popup({ offset: 10 })
-              .setLngLat([lng, lat])
-              .setHTML(
-                `<div style="color:#0f172a;font-family:sans-serif;font-size:13px">
-                  <strong>Station ${station_id}</strong><br/>
-                  ⭐ Rating: ${rating.toFixed(1)}<br/>
-                  💲 Cost: $${cost.toFixed(2)}/kWh
-                </div>`
-              )
-              .addTo(map);
-          });
-
-          map.on('mouseenter', 'stations-layer', () => {
-            map.getCanvas().style.cursor = 'pointer';
-          });
-          map.on('mouseleave', 'stations-layer', () => {
-            map.getCanvas().style.cursor = '';
-          });
+          map.getSource('stations')?.setData({ type: 'FeatureCollection', features });
         })
         .catch(() => setLoadingStations(false));
+    };
+
+    map.on('load', () => {
+      map.addSource('stations', {
+        type: 'geojson',
+        data: { type: 'FeatureCollection', features: [] },
+      });
+
+      // Glow halo
+      map.addLayer({
+        id: 'stations-halo',
+        type: 'circle',
+        source: 'stations',
+        paint: {
+          'circle-radius': ['case', ['has', 'point_count'], 18, 10],
+          'circle-color': '#69E300',
+          'circle-opacity': 0.15,
+          'circle-blur': 1,
+        },
+      });
+
+      // Main dot (server-side clusters are drawn larger)
+      map.addLayer({
+        id: 'stations-layer',
+        type: 'circle',
+        source: 'stations',
+        paint: {
+          'circle-radius': ['case', ['has', 'point_count'], 12, 5],
+          'circle-color': '#69E300',
+          'circle-stroke-width': 1.5,
+          'circle-stroke-color': '#fff',
+        },
+      });
+
+      map.addLayer({
+        id: 'stations-count',
+        type: 'symbol',
+        source: 'stations',
+        filter: ['has', 'point_count'],
+        layout: { 'text-field': ['get', 'point_count'], 'text-size': 11 },
+        paint: { 'text-color': '#0f172a' },
+      });
+
+      // Popup on click; clicking a cluster zooms into it
+      map.on('click', 'stations-layer', (e) => {
+        const props = e.features[0].properties;
+        const [lng, lat] = e.features[0].geometry.coordinates;
+        if (props.point_count) {
+          map.easeTo({ center: [lng, lat], zoom: map.getZoom() + 2 });
+          return;
+        }
+        const { station_id, rating, cost } = props;
+        new mapboxgl.Popup({ offset: 10 })
+          .setLngLat([lng, lat])
+          .setHTML(
+            `<div style="color:#0f172a;font-family:sans-serif;font-size:13px">
+              <strong>Station ${station_id}</strong><br/>
+              ⭐ Rating: ${rating.toFixed(1)}<br/>
+              💲 Cost: $${cost.toFixed(2)}/kWh
+            </div>`
+          )
+          .addTo(map);
+      });
+
+      map.on('mouseenter', 'stations-layer', () => {
+        map.getCanvas().style.cursor = 'pointer';
+      });
+      map.on('mouseleave', 'stations-layer', () => {
+        map.getCanvas().style.cursor = '';
+      });
+
+      loadViewport();
     });
 
+    map.on('moveend', loadViewport);
+
     return () => {
       if (bestMarkerRef.current) bestMarkerRef.current.remove();
       map.remove();
@@ -209,7 +263,7 @@ const ChargingStations = ({ routeData }) => {
         <p className="text-gray-400 text-sm mb-6">
           {loadingStations
             ? 'Loading stations…'
-            : `${stationCount.toLocaleString()} charging stations loaded from dataset`}
+            : `${stationCount.toLocaleString()} charging stations in view`}
         </p>
 
         {/* Low-battery / insufficient battery banners */}